@@ -1,50 +1,238 @@
 import numpy as np
 import sympy as sp
 
-def Rz(var):
+import functools
+import numbers
+import typing as ty
+
+# The transform builders return sympy matrices (compose them with *). Plain Python/NumPy numbers are
+# evaluated by the batch_* kernels below; symbolic arguments (symbols, sympy numbers, expressions)
+# give exact matrices, memoized by argument. Angles are in degrees.
+
+def _is_number(var) -> bool:
+    return isinstance(var, numbers.Real) and not isinstance(var, sp.Basic)
+
+def _exact(builder, var) -> sp.ImmutableMatrix:
+    """ builder(var), bypassing its cache for plain numbers so one-off slider values are not kept """
+    return builder.__wrapped__(var) if _is_number(var) else builder(var)
+
+@functools.lru_cache(maxsize=4096)
+def _symbolic_Rz(var) -> sp.ImmutableMatrix:
     var = sp.rad(var)
-    return sp.Matrix([[sp.cos(var), -sp.sin(var), 0, 0],
+    return sp.ImmutableMatrix([[sp.cos(var), -sp.sin(var), 0, 0],
                     [sp.sin(var), sp.cos(var), 0, 0],
                     [0, 0, 1, 0],
                     [0, 0, 0, 1]])
 
-def Ry(var):
+@functools.lru_cache(maxsize=4096)
+def _symbolic_Ry(var) -> sp.ImmutableMatrix:
     var = sp.rad(var)
-    return sp.Matrix([[sp.cos(var), 0, sp.sin(var), 0],
+    return sp.ImmutableMatrix([[sp.cos(var), 0, sp.sin(var), 0],
                     [0, 1, 0, 0],
                     [-sp.sin(var), 0, sp.cos(var), 0],
                     [0, 0, 0, 1]])
 
-def Rx(var):
+@functools.lru_cache(maxsize=4096)
+def _symbolic_Rx(var) -> sp.ImmutableMatrix:
     var = sp.rad(var)
-    return sp.Matrix([[1, 0, 0, 0],
+    return sp.ImmutableMatrix([[1, 0, 0, 0],
                     [0, sp.cos(var), -sp.sin(var), 0],
                     [0, sp.sin(var), sp.cos(var), 0],
                     [0, 0, 0, 1]])
 
-def Dz(var):
-    return sp.Matrix([[1, 0, 0, 0],
+@functools.lru_cache(maxsize=4096)
+def _symbolic_Dz(var) -> sp.ImmutableMatrix:
+    return sp.ImmutableMatrix([[1, 0, 0, 0],
                     [0, 1, 0, 0],
                     [0, 0, 1, var],
                     [0, 0, 0, 1]])
 
-def Dy(var):
-    return sp.Matrix([[1, 0, 0, 0],
+@functools.lru_cache(maxsize=4096)
+def _symbolic_Dy(var) -> sp.ImmutableMatrix:
+    return sp.ImmutableMatrix([[1, 0, 0, 0],
                     [0, 1, 0, var],
                     [0, 0, 1, 0],
                     [0, 0, 0, 1]])
 
-def Dx(var):
-    return sp.Matrix([[1, 0, 0, var],
+@functools.lru_cache(maxsize=4096)
+def _symbolic_Dx(var) -> sp.ImmutableMatrix:
+    return sp.ImmutableMatrix([[1, 0, 0, var],
                     [0, 1, 0, 0],
                     [0, 0, 1, 0],
                     [0, 0, 0, 1]])
 
+def Rz(var) -> sp.Matrix:
+    return sp.Matrix(batch_Rz(var)) if _is_number(var) else sp.Matrix(_symbolic_Rz(var))
+
+def Ry(var) -> sp.Matrix:
+    return sp.Matrix(batch_Ry(var)) if _is_number(var) else sp.Matrix(_symbolic_Ry(var))
+
+def Rx(var) -> sp.Matrix:
+    return sp.Matrix(batch_Rx(var)) if _is_number(var) else sp.Matrix(_symbolic_Rx(var))
+
+def Dz(var) -> sp.Matrix:
+    return sp.Matrix(batch_Dz(var)) if _is_number(var) else sp.Matrix(_symbolic_Dz(var))
+
+def Dy(var) -> sp.Matrix:
+    return sp.Matrix(batch_Dy(var)) if _is_number(var) else sp.Matrix(_symbolic_Dy(var))
+
+def Dx(var) -> sp.Matrix:
+    return sp.Matrix(batch_Dx(var)) if _is_number(var) else sp.Matrix(_symbolic_Dx(var))
+
 def RxDx(alfa, a) -> sp.Matrix:
-    return Rx(alfa) * Dx(a)
+    if _is_number(alfa) and _is_number(a):
+        return sp.Matrix(batch_RxDx(alfa, a))
+    return sp.Matrix(_exact(_symbolic_Rx, alfa) * _exact(_symbolic_Dx, a))
 
 def RzDz(tita, d) -> sp.Matrix:
-    return Rz(tita) * Dz(d)
+    if _is_number(tita) and _is_number(d):
+        return sp.Matrix(batch_RzDz(tita, d))
+    return sp.Matrix(_exact(_symbolic_Rz, tita) * _exact(_symbolic_Dz, d))
 
 def T(alfa, a, tita, d) -> sp.Matrix:
-    return Rx(alfa) * Dx(a) * Rz(tita) * Dz(d)
\ No newline at end of file
+    if all(_is_number(v) for v in (alfa, a, tita, d)):
+        return sp.Matrix(batch_T(alfa, a, tita, d))
+    return sp.Matrix(_exact(_symbolic_Rx, alfa) * _exact(_symbolic_Dx, a) *
+                     _exact(_symbolic_Rz, tita) * _exact(_symbolic_Dz, d))
+
+# Batched NumPy kernels
+# Angles are in degrees, as in the symbolic builders above.
+# Inputs broadcast against each other: (N,) arrays give (N, 4, 4) transforms,
+# (M, N) arrays give (M, N, 4, 4) transforms for M configurations of an N-joint chain.
+# batch_RxDx and batch_RzDz can write into a preallocated out buffer of that shape.
+
+def _numeric_rotation(var, i, j) -> np.ndarray:
+    """ Rotation by var degrees that maps axis i towards axis j """
+    t = np.deg2rad(np.asarray(var, dtype=np.float64))
+    c, s = np.cos(t), np.sin(t)
+    out = np.zeros(t.shape + (4, 4))
+    out[..., range(4), range(4)] = 1
+    out[..., i, i] = c
+    out[..., i, j] = -s
+    out[..., j, i] = s
+    out[..., j, j] = c
+    return out
+
+def _numeric_translation(var, row) -> np.ndarray:
+    d = np.asarray(var, dtype=np.float64)
+    out = np.zeros(d.shape + (4, 4))
+    out[..., range(4), range(4)] = 1
+    out[..., row, 3] = d
+    return out
+
+def batch_Rz(var) -> np.ndarray:
+    return _numeric_rotation(var, 0, 1)
+
+def batch_Ry(var) -> np.ndarray:
+    return _numeric_rotation(var, 2, 0)
+
+def batch_Rx(var) -> np.ndarray:
+    return _numeric_rotation(var, 1, 2)
+
+def batch_Dz(var) -> np.ndarray:
+    return _numeric_translation(var, 2)
+
+def batch_Dy(var) -> np.ndarray:
+    return _numeric_translation(var, 1)
+
+def batch_Dx(var) -> np.ndarray:
+    return _numeric_translation(var, 0)
+
+def batch_RxDx(alfa, a, out: np.ndarray = None) -> np.ndarray:
+    alfa, a = np.broadcast_arrays(np.deg2rad(np.asarray(alfa, dtype=np.float64)),
+                                  np.asarray(a, dtype=np.float64))
+    ca, sa = np.cos(alfa), np.sin(alfa)
+    if out is None:
+        out = np.zeros(alfa.shape + (4, 4))
+    else:
+        out[...] = 0
+    out[..., 0, 0] = 1
+    out[..., 0, 3] = a
+    out[..., 1, 1] = ca
+    out[..., 1, 2] = -sa
+    out[..., 2, 1] = sa
+    out[..., 2, 2] = ca
+    out[..., 3, 3] = 1
+    return out
+
+def batch_RzDz(tita, d, out: np.ndarray = None) -> np.ndarray:
+    tita, d = np.broadcast_arrays(np.deg2rad(np.asarray(tita, dtype=np.float64)),
+                                  np.asarray(d, dtype=np.float64))
+    ct, st = np.cos(tita), np.sin(tita)
+    if out is None:
+        out = np.zeros(tita.shape + (4, 4))
+    else:
+        out[...] = 0
+    out[..., 0, 0] = ct
+    out[..., 0, 1] = -st
+    out[..., 1, 0] = st
+    out[..., 1, 1] = ct
+    out[..., 2, 2] = 1
+    out[..., 2, 3] = d
+    out[..., 3, 3] = 1
+    return out
+
+def batch_T(alfa, a, tita, d) -> np.ndarray:
+    """
+    Closed form of Rx(alfa) * Dx(a) * Rz(tita) * Dz(d) for every element of the broadcast inputs.
+    """
+    alfa, a, tita, d = np.broadcast_arrays(np.deg2rad(np.asarray(alfa, dtype=np.float64)),
+                                           np.asarray(a, dtype=np.float64),
+                                           np.deg2rad(np.asarray(tita, dtype=np.float64)),
+                                           np.asarray(d, dtype=np.float64))
+    ca, sa = np.cos(alfa), np.sin(alfa)
+    ct, st = np.cos(tita), np.sin(tita)
+    out = np.empty(alfa.shape + (4, 4))
+    out[..., 0, 0] = ct
+    out[..., 0, 1] = -st
+    out[..., 0, 2] = 0
+    out[..., 0, 3] = a
+    out[..., 1, 0] = ca * st
+    out[..., 1, 1] = ca * ct
+    out[..., 1, 2] = -sa
+    out[..., 1, 3] = -sa * d
+    out[..., 2, 0] = sa * st
+    out[..., 2, 1] = sa * ct
+    out[..., 2, 2] = ca
+    out[..., 2, 3] = ca * d
+    out[..., 3, :] = (0, 0, 0, 1)
+    return out
+
+def batch_chain(links: np.ndarray, origin: np.ndarray = None) -> np.ndarray:
+    """
+    Cumulative frames of a stack of link transforms with shape (..., N, 4, 4).
+    frames[..., i, :, :] = origin @ links[..., 0, :, :] @ ... @ links[..., i, :, :]
+    The product runs over the joint axis with one batched matmul per joint.
+    """
+    links = np.asarray(links, dtype=np.float64)
+    frames = np.empty_like(links)
+    if links.shape[-3] == 0:
+        return frames
+    current = links[..., 0, :, :] if origin is None else np.asarray(origin, dtype=np.float64) @ links[..., 0, :, :]
+    frames[..., 0, :, :] = current
+    for i in range(1, links.shape[-3]):
+        current = np.matmul(current, links[..., i, :, :], out=frames[..., i, :, :])
+    return frames
+
+def batch_forward(alfa, a, tita, d, origin: np.ndarray = None) -> ty.Tuple[np.ndarray, np.ndarray]:
+    """
+    Batched forward kinematics of DH chains.
+    Takes (N,) or (M, N) arrays of DH parameters (angles in degrees) and returns
+    (links, frames), both with shape (M, N, 4, 4) (or (N, 4, 4) for 1-D inputs),
+    where frames are the cumulative products of links.
+    """
+    links = batch_T(alfa, a, tita, d)
+    return links, batch_chain(links, origin)
+
+def end_positions(params: np.ndarray, origin: np.ndarray = None) -> np.ndarray:
+    """
+    End-effector positions of M chain configurations.
+    params has shape (M, N, 4) with the DH values (alfa, a, tita, d) of each joint.
+    Returns an (M, 3) array. Only the running product is kept, not the intermediate frames.
+    """
+    params = np.asarray(params, dtype=np.float64)
+    links = batch_T(params[..., 0], params[..., 1], params[..., 2], params[..., 3])
+    current = links[:, 0] if origin is None else np.asarray(origin, dtype=np.float64) @ links[:, 0]
+    for i in range(1, links.shape[1]):
+        current = current @ links[:, i]
+    return current[:, :3, 3]
@@ -0,0 +1,101 @@
+import numpy as np
+
+from backend.math.Functions import batch_T, batch_chain
+from backend.math.MathCore import geometric_jacobian
+
+import typing as ty
+
+class IKResult:
+    params: np.ndarray
+    error: float
+    iterations: int
+    converged: bool
+    def __init__(self, params: np.ndarray, error: float, iterations: int, converged: bool):
+        self.params = params
+        self.error = error
+        self.iterations = iterations
+        self.converged = converged
+
+def _pose_error(frames: np.ndarray, target: np.ndarray, orientation: bool) -> np.ndarray:
+    """
+    Error twist (S, 3) or (S, 6) between the end effectors of frames (S, N, 4, 4) and target (4, 4).
+    The orientation part is 0.5 * sum_k(r_k x r_target_k), which vanishes when the rotations match.
+    """
+    end = frames[:, -1]
+    e_pos = target[:3, 3] - end[:, :3, 3]
+    if not orientation:
+        return e_pos
+    e_rot = 0.5 * np.cross(np.swapaxes(end[:, :3, :3], 1, 2), target[:3, :3].T).sum(axis=1)
+    return np.concatenate([e_pos, e_rot], axis=1)
+
+def solve_ik(params: np.ndarray,
+             target: np.ndarray,
+             joint_types: ty.Optional[str] = None,
+             limits: ty.Optional[np.ndarray] = None,
+             orientation: bool = False,
+             seeds: int = 32,
+             max_iter: int = 20,
+             tol: float = 1e-4,
+             damping: float = 0.1,
+             max_step: float = 20.0,
+             origin: np.ndarray = None,
+             rng: ty.Optional[np.random.Generator] = None) -> IKResult:
+    """
+    Damped least squares inverse kinematics of a DH chain, run from many seeds at once.
+
+    - params:      (N, 4) current DH values (alfa, a, tita, d), angles in degrees. It is the first seed.
+    - target:      (4, 4) target pose, or (3,) target position
+    - joint_types: one letter per joint, 'R' (tita varies) or 'P' (d varies). Defaults to all revolute.
+    - limits:      (N, 2) interval of each joint variable, used to draw the seeds and clamp the steps
+    - orientation: also match the target rotation, not only its position
+
+    Every iteration is one batched forward kinematics pass plus one batched (m x m) solve over
+    all seeds. The loop stops as soon as any seed converges, and the best seed is returned.
+    """
+    params = np.asarray(params, dtype=np.float64)
+    N = params.shape[0]
+    joint_types = joint_types or 'R' * N
+    if len(joint_types) != N:
+        raise ValueError("joint_types must have one letter per joint")
+    target = np.asarray(target, dtype=np.float64)
+    if target.shape == (3,):
+        position = target
+        target = np.identity(4)
+        target[:3, 3] = position
+        orientation = False
+    origin = np.identity(4) if origin is None else np.asarray(origin, dtype=np.float64)
+
+    revolute = np.array([kind == 'R' for kind in joint_types])
+    column = np.where(revolute, 2, 3)
+    joints = np.arange(N)
+    if limits is None:
+        limits = np.where(revolute[:, None], (-180.0, 180.0), (0.0, 100.0))
+    limits = np.asarray(limits, dtype=np.float64)
+    rng = rng or np.random.default_rng()
+
+    # all seeds share the fixed DH values, only the joint variables differ
+    q = rng.uniform(limits[:, 0], limits[:, 1], (seeds, N))
+    q[0] = params[joints, column]
+    # joint variables are degrees for revolute joints, the Jacobian is per radian
+    scale = np.where(revolute, np.rad2deg(1.0), 1.0)
+    m = 6 if orientation else 3
+    eye = np.identity(m)
+
+    batch = np.repeat(params[None], seeds, axis=0)
+    for iteration in range(1, max_iter + 1):
+        batch[:, joints, column] = q
+        frames = batch_chain(batch_T(batch[..., 0], batch[..., 1], batch[..., 2], batch[..., 3]), origin)
+        e = _pose_error(frames, target, orientation)
+        error = np.linalg.norm(e, axis=1)
+        best = int(np.argmin(error))
+        if error[best] < tol:
+            break
+
+        J = geometric_jacobian(frames, revolute, orientation)
+        JJt = J @ np.swapaxes(J, 1, 2) + (damping ** 2) * eye
+        dq = (np.swapaxes(J, 1, 2) @ np.linalg.solve(JJt, e[..., None]))[..., 0] * scale
+        q = np.clip(q + np.clip(dq, -max_step, max_step), limits[:, 0], limits[:, 1])
+
+    solution = params.copy()
+    solution[joints, column] = batch[best, joints, column]
+    return IKResult(solution, float(error[best]), iteration, bool(error[best] < tol))
@@ -1,10 +1,24 @@
 import numpy as np
 import sympy as sp
 
-from backend.math.Functions import Rz, Ry, Rx, Dz, Dy, Dx, RxDx, RzDz, T
+from backend.math.Functions import Rz, Ry, Rx, Dz, Dy, Dx, RxDx, RzDz, T, batch_T, batch_RxDx, batch_RzDz, batch_forward, end_positions
 
+import ast
+import functools
+import hashlib
+import logging
+import os
 import typing as ty
 
+log = logging.getLogger(__name__)
+
+# On-disk cache of simplified symbolic chains (see JointChain.simplify)
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "pyqt5-3D-vector-plotter")
+
+# Names sp.srepr can write: sympy classes (Symbol, Add, cos, ImmutableDenseMatrix, ...) and constants (pi, E, ...)
+SREPR_NAMES = {name: obj for name, obj in vars(sp).items()
+               if isinstance(obj, sp.Basic) or (isinstance(obj, type) and issubclass(obj, sp.Basic))}
+
 class Line3D:
     P0: np.ndarray
     P1: np.ndarray
@@ -21,6 +35,16 @@ class DHParams:
         self.tita = tita
         self.d = d
 
+    @classmethod
+    def symbolic(cls, i: int) -> 'DHParams':
+        """
+        DH parameters of joint i as real sympy symbols (alfa_i, a_i, tita_i, d_i).
+        """
+        return cls(*sp.symbols(f"alfa{i} a{i} tita{i} d{i}", real=True))
+
+    def values(self) -> tuple:
+        return (self.alfa, self.a, self.tita, self.d)
+
     def T(self) -> sp.Matrix:
         return T(self.alfa, self.a, self.tita, self.d)
     
@@ -31,37 +55,433 @@ class DHParams:
         return RzDz(self.tita, self.d)
     
     def Tf(self) -> np.ndarray:
-        T_sym = self.T()
-        T_num = T_sym.evalf()
-        T_np = np.array(T_num).astype(np.float64)
-        return T_np
+        # numeric values skip sympy entirely
+        try:
+            values = [float(v) for v in self.values()]
+        except TypeError:
+            return np.array(self.T().evalf()).astype(np.float64)
+        return batch_T(*values)
+
+def _row_property(i: int) -> property:
+    def getter(self):
+        return self.row[i]
+    def setter(self, value):
+        self.row[i] = value
+    return property(getter, setter)
+
+class JointView(DHParams):
+    """
+    DHParams backed by a row (alfa, a, tita, d) of a ChainArray parameter array.
+    """
+    def __init__(self, row: np.ndarray):
+        self.row = row
+
+    alfa = _row_property(0)
+    a = _row_property(1)
+    tita = _row_property(2)
+    d = _row_property(3)
+
+def dh_symbols(n: int) -> ty.List[ty.Tuple[sp.Symbol, sp.Symbol, sp.Symbol, sp.Symbol]]:
+    """
+    Symbolic DH variables (alfa_i, a_i, tita_i, d_i) for each joint of an n-joint chain.
+    """
+    return [DHParams.symbolic(i).values() for i in range(n)]
+
+def _bind(matrix: sp.Matrix, name: str, assignments: list) -> sp.Matrix:
+    """
+    Replace every non-constant entry of matrix by a new symbol and record (symbol, expr) in assignments.
+    """
+    def entry(r, c):
+        expr = matrix[r, c]
+        if expr.is_number:
+            return expr
+        symbol = sp.Symbol(f"_{name}_{r}{c}")
+        assignments.append((symbol, expr))
+        return symbol
+    return sp.Matrix(matrix.rows, matrix.cols, entry)
+
+@functools.lru_cache(maxsize=None)
+def compile_frames(n: int) -> ty.Callable[..., ty.List[np.ndarray]]:
+    """
+    Compile the 2n intermediate frames of an n-joint chain into a NumPy function.
+    The returned function takes the flat DH values (alfa0, a0, tita0, d0, alfa1, ...)
+    and returns the frames after RxDx and after RzDz of every joint, in chain order.
+
+    Every non-constant frame entry is bound to an intermediate symbol, so the
+    generated code grows linearly with n instead of expanding the full product.
+    The result is cached by chain topology (number of joints).
+    """
+    symbols = dh_symbols(n)
+    assignments = []
+    frames = []
+    current = sp.eye(4)
+    for i, (alfa, a, tita, d) in enumerate(symbols):
+        for half, M in enumerate((RxDx(alfa, a), RzDz(tita, d))):
+            current = _bind(current * M, f"f{2*i + half}", assignments)
+            frames.append(current)
+
+    args = [s for joint in symbols for s in joint]
+    return sp.lambdify(args, frames, modules="numpy", cse=lambda exprs: (assignments, exprs))
+
+@functools.lru_cache(maxsize=None)
+def compile_jacobian(joint_types: str) -> ty.Callable[..., np.ndarray]:
+    """
+    Compile the 6xn geometric Jacobian of a chain into a NumPy function of the flat DH values.
+    joint_types has one letter per joint: 'R' (revolute, variable tita) or 'P' (prismatic, variable d).
+
+    The linear velocity rows are the symbolic derivatives of the end-effector position,
+    propagated joint by joint (dF_i = dF_(i-1) * L_i + F_(i-1) * dL_i) through bound intermediate
+    symbols, so the generated code stays O(n^2). The angular rows are the joint z axes.
+    Revolute columns are per radian. The result is cached by joint_types.
+    """
+    symbols = dh_symbols(len(joint_types))
+    assignments = []
+    current = sp.eye(4)
+    derivatives = []    # d(current)/dq_j of the joints seen so far
+    axes = []
+    for i, ((alfa, a, tita, d), kind) in enumerate(zip(symbols, joint_types)):
+        rxdx, rzdz = RxDx(alfa, a), RzDz(tita, d)
+        link = rxdx * rzdz
+        if kind == 'R':
+            dlink = rxdx * rzdz.diff(tita) * 180 / sp.pi
+        elif kind == 'P':
+            dlink = rxdx * rzdz.diff(d)
+        else:
+            raise ValueError(f"Unknown joint type '{kind}', must be 'R' or 'P'")
+
+        derivatives = [_bind(D * link, f"d{j}_{i}", assignments) for j, D in enumerate(derivatives)]
+        derivatives.append(_bind(current * dlink, f"d{i}_{i}", assignments))
+        current = _bind(current * link, f"f{i}", assignments)
+        axes.append(current[:3, 2] if kind == 'R' else sp.zeros(3, 1))
+
+    J = sp.Matrix.vstack(sp.Matrix.hstack(*[D[:3, 3] for D in derivatives]), sp.Matrix.hstack(*axes))
+    args = [s for joint in symbols for s in joint]
+    return sp.lambdify(args, J, modules="numpy", cse=lambda exprs: (assignments, exprs))
+
+def batch_jacobian(params: np.ndarray,
+                   joint_types: ty.Optional[str] = None,
+                   eps: float = 1e-5,
+                   origin: np.ndarray = None,
+                   chunk_size: int = 8192) -> np.ndarray:
+    """
+    Geometric Jacobians of many chain configurations at once.
+    params has shape (M, N, 4) (or (N, 4)) with the DH values of each joint, angles in degrees.
+    Returns (M, 6, N) (or (6, N)) arrays. The linear velocity rows are central finite
+    differences (eps in radians or length units), evaluated as one batched forward
+    kinematics pass per chunk of configurations; the angular rows are the joint z axes.
+    """
+    params = np.asarray(params, dtype=np.float64)
+    single = params.ndim == 2
+    if single:
+        params = params[None]
+    M, N = params.shape[:2]
+    joint_types = joint_types or 'R' * N
+    if len(joint_types) != N:
+        raise ValueError("joint_types must have one letter per joint")
+    revolute = np.array([kind == 'R' for kind in joint_types])
+    columns = np.where(revolute, 2, 3)
+    steps = np.where(revolute, np.rad2deg(eps), eps)
+
+    J = np.zeros((M, 6, N))
+    joints = np.arange(N)
+    for lo in range(0, M, chunk_size):
+        chunk = params[lo:lo + chunk_size]
+        k = chunk.shape[0]
+
+        # (k, N, 2, N, 4): configuration j, +/- step applied to the variable of joint j
+        perturbed = np.repeat(np.repeat(chunk[:, None, None], N, axis=1), 2, axis=2)
+        perturbed[:, joints, 0, joints, columns] += steps
+        perturbed[:, joints, 1, joints, columns] -= steps
+        positions = end_positions(perturbed.reshape(-1, N, 4), origin).reshape(k, N, 2, 3)
+        J[lo:lo + k, :3] = np.swapaxes(positions[:, :, 0] - positions[:, :, 1], 1, 2) / (2 * eps)
+
+        frames = batch_forward(chunk[..., 0], chunk[..., 1], chunk[..., 2], chunk[..., 3], origin)[1]
+        J[lo:lo + k, 3:, revolute] = np.swapaxes(frames[..., :3, 2][:, revolute], 1, 2)
+    return J[0] if single else J
+
+def geometric_jacobian(frames: np.ndarray, revolute: np.ndarray, orientation: bool = True) -> np.ndarray:
+    """
+    Closed-form geometric Jacobians (S, 3 or 6, N) of the joint variables from the joint frames (S, N, 4, 4).
+    revolute is an (N,) bool mask, False for prismatic joints. Revolute columns are per radian.
+    Joint i moves about / along the z axis of its frame, which passes through frames[:, i, :3, 3].
+    """
+    z = frames[..., :3, 2]
+    o = frames[..., :3, 3]
+    p = o[:, -1:, :]
+    jv = np.where(revolute[None, :, None], np.cross(z, p - o), z)
+    if not orientation:
+        return np.swapaxes(jv, 1, 2)
+    jw = np.where(revolute[None, :, None], z, 0.0)
+    return np.swapaxes(np.concatenate([jv, jw], axis=2), 1, 2)
+
+def manipulability(J: np.ndarray) -> np.ndarray:
+    """
+    Yoshikawa manipulability of one or many Jacobians (..., m, n): the product of the singular values,
+    i.e. sqrt(det(J J^T)) for n >= m.
+    """
+    return np.prod(np.linalg.svd(J, compute_uv=False), axis=-1)
+
+def condition_number(J: np.ndarray) -> np.ndarray:
+    """
+    Ratio of the largest to the smallest singular value of one or many Jacobians (..., m, n).
+    Singular configurations give inf.
+    """
+    s = np.linalg.svd(J, compute_uv=False)
+    with np.errstate(divide='ignore'):
+        return s[..., 0] / s[..., -1]
+
+def chain_key(origin, joints: ty.List[DHParams]) -> str:
+    """
+    Hash of the chain structure: origin, DH values (symbols or numbers) of every joint and sympy version.
+    """
+    structure = sp.srepr(sp.Tuple(sp.ImmutableMatrix(origin), *[sp.Tuple(*joint.values()) for joint in joints]))
+    return hashlib.sha1(f"{sp.__version__}:{structure}".encode()).hexdigest()
+
+def _srepr_value(node: ast.AST):
+    """
+    Value of one validated node of srepr text. Strings are only accepted as the name of a Symbol or
+    Dummy and as the digits of a Float, since sympy classes sympify (evaluate) string arguments.
+    """
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
+        return node.value
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+        return -_srepr_value(node.operand)
+    if isinstance(node, (ast.Tuple, ast.List)):
+        values = [_srepr_value(element) for element in node.elts]
+        return tuple(values) if isinstance(node, ast.Tuple) else values
+    if isinstance(node, ast.Name) and isinstance(SREPR_NAMES.get(node.id), sp.Basic):
+        return SREPR_NAMES[node.id]
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in SREPR_NAMES:
+        name = node.func.id
+        args = list(node.args)
+        first = []
+        if args and isinstance(args[0], ast.Constant) and isinstance(args[0].value, str):
+            text = args.pop(0).value
+            if name == 'Float':
+                float(text)     # digits only, raises ValueError otherwise
+            elif name not in ('Symbol', 'Dummy'):
+                raise ValueError(f"unexpected string argument of {name} in srepr text")
+            first = [text]
+        kwds = {}
+        for keyword in node.keywords:
+            value = keyword.value
+            if keyword.arg is None or not (isinstance(value, ast.Constant) and isinstance(value.value, (bool, int))):
+                raise ValueError(f"unexpected keyword argument of {name} in srepr text")
+            kwds[keyword.arg] = value.value
+        return SREPR_NAMES[name](*first, *[_srepr_value(arg) for arg in args], **kwds)
+    raise ValueError(f"unexpected {type(node).__name__} in srepr text")
+
+def parse_srepr(text: str):
+    """
+    Read back an expression written with sp.srepr without evaluating the text: the syntax tree is
+    walked and only the SREPR_NAMES constructors are called, with numbers, nested calls and
+    Symbol names as arguments. Anything else raises ValueError.
+    """
+    return _srepr_value(ast.parse(text, mode='eval').body)
+
+def _load_cse(key: str):
+    path = os.path.join(CACHE_DIR, key + ".txt")
+    if not os.path.isfile(path):
+        return None
+    try:
+        with open(path) as f:
+            replacements, reduced = parse_srepr(f.read())
+    except (OSError, SyntaxError, TypeError, ValueError) as e:
+        log.warning("Ignoring invalid chain cache %s: %s", path, e)
+        return None
+    return [tuple(r) for r in replacements], sp.Matrix(reduced)
+
+def _store_cse(key: str, replacements, reduced):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = os.path.join(CACHE_DIR, key + ".txt")
+    with open(path + ".tmp", "w") as f:
+        f.write(sp.srepr(sp.Tuple(sp.Tuple(*[sp.Tuple(*r) for r in replacements]), sp.ImmutableMatrix(reduced))))
+    os.replace(path + ".tmp", path)
 
 class JointChain:
-    def __init__(self):
+    """
+    Serial chain of DH joints.
+    - mode='symbolic': frames are sympy matrices built by multiplying each joint's transforms
+    - mode='numeric':  frames are float64 arrays evaluated by the compiled chain (see compile_frames)
+
+    The chain caches each joint's RxDx/RzDz matrices and the prefix products of the frames.
+    compute() only rebuilds the links whose DH values changed and the frames from the
+    first changed joint k onward, so editing joint k of an N-joint chain costs O(N-k).
+    """
+    def __init__(self, mode: ty.Literal['symbolic', 'numeric'] = 'symbolic'):
+        if mode not in ('symbolic', 'numeric'):
+            raise ValueError(f"Unknown JointChain mode '{mode}'")
+        self.mode = mode
         self.end_effector = sp.Identity(4)
         self.origin = sp.Identity(4)
         self.joints = []
         self.lines = []
 
+        self._link_values = []  # DH values each cached (RxDx, RzDz) pair was built from
+        self._links = []        # cached (RxDx, RzDz) per joint, None until first needed
+        self._frames = []       # cached exact (P1, P2) prefix, one pair per joint
+        self._origin = None     # origin the cached prefix was built from
+
     def clear(self):
         self.joints = []
         self.lines = []
+        self.invalidate()
 
     def append(self, joint: DHParams):
         self.joints.append(joint)
 
+    def set_joint(self, index: int, joint: DHParams):
+        """
+        Replace joint index (or append it when index == length()).
+        Cached frames are only dropped from the first joint whose DH values actually change.
+        """
+        if index == len(self.joints):
+            self.joints.append(joint)
+        else:
+            self.joints[index] = joint
+
+    def invalidate(self, k: int = 0):
+        """
+        Drop the cached links and frames of joints k..N.
+        """
+        del self._link_values[k:]
+        del self._links[k:]
+        del self._frames[k:]
+        del self.lines[k:]
+        if k == 0:
+            self._origin = None
+
+    def _first_changed(self) -> int:
+        if self._origin is not self.origin:
+            return 0
+        n = min(len(self.joints), len(self._frames))
+        for i in range(n):
+            if self._link_values[i] != self.joints[i].values():
+                return i
+        return n
+
+    def _link(self, i: int):
+        joint = self.joints[i]
+        values = joint.values()
+        if i < len(self._links) and self._links[i] is not None and self._link_values[i] == values:
+            return self._links[i]
+
+        if self.mode == 'numeric':
+            link = (batch_RxDx(float(joint.alfa), float(joint.a)), batch_RzDz(float(joint.tita), float(joint.d)))
+        else:
+            # numeric DH values give NumPy links, symbolic mode keeps the frames as sympy matrices
+            link = (joint.RxDx(), joint.RzDz())
+        if i < len(self._links):
+            self._link_values[i] = values
+            self._links[i] = link
+        else:
+            self._link_values.append(values)
+            self._links.append(link)
+        return link
+
     def compute(self):
-        current = self.origin
-        for joint in self.joints:
-            line = Line3D()
-            line.P0 = current.evalf()
-            current = current * joint.RxDx()
-            line.P1 = current.evalf()
-            current = current * joint.RzDz()
-            line.P2 = current.evalf()
+        k = self._first_changed()
+        del self._frames[k:]
+        del self.lines[k:]
+        del self._link_values[len(self.joints):]
+        del self._links[len(self.joints):]
+        self._origin = self.origin
+
+        if self.mode == 'numeric':
+            if k == 0 and self.joints:
+                self._compute_compiled()
+            else:
+                self._compute_from(k)
+        else:
+            self._compute_from(k)
+
+    def _start(self, k: int):
+        if k > 0:
+            return self._frames[k-1][1]
+        if self.mode == 'numeric':
+            return np.array(sp.Matrix(self.origin), dtype=np.float64)
+        return self.origin
+
+    def _compute_from(self, k: int):
+        current = self._start(k)
+        for i in range(k, len(self.joints)):
+            rxdx, rzdz = self._link(i)
+            if self.mode == 'numeric':
+                P1 = current @ rxdx
+                P2 = P1 @ rzdz
+                line = Line3D(current, P1, P2)
+            else:
+                P1 = current * rxdx
+                P2 = P1 * rzdz
+                line = Line3D(current.evalf(), P1.evalf(), P2.evalf())
+            self._frames.append((P1, P2))
             self.lines.append(line)
+            current = P2
+        self.end_effector = current
+
+    def _compute_compiled(self):
+        origin = self._start(0)
+        values = [float(v) for joint in self.joints for v in joint.values()]
+        frames = origin @ np.array(compile_frames(len(self.joints))(*values), dtype=np.float64)
+
+        # the compiled path does not build the per-joint links, they are created on demand
+        self._link_values = [joint.values() for joint in self.joints]
+        self._links = [None] * len(self.joints)
+
+        current = origin
+        for i in range(len(self.joints)):
+            P1, P2 = frames[2*i], frames[2*i + 1]
+            self._frames.append((P1, P2))
+            self.lines.append(Line3D(current, P1, P2))
+            current = P2
         self.end_effector = current
 
+    def simplify(self, simplifier: ty.Callable = sp.factor_terms, use_cache: bool = True):
+        """
+        Symbolic end effector of the chain, simplified joint by joint and reduced with CSE.
+        Returns (replacements, reduced) as sp.cse does, and sets self.end_effector to the full matrix.
+
+        The result is stored in CACHE_DIR keyed by the chain structure (see chain_key),
+        so a chain of symbolic joints (DHParams.symbolic) is only simplified once across sessions.
+        """
+        key = chain_key(self.origin, self.joints) if use_cache else None
+        cached = _load_cse(key) if use_cache else None
+        if cached is not None:
+            replacements, reduced = cached
+        else:
+            current = sp.Matrix(self.origin)
+            for joint in self.joints:
+                current = (current * joint.RxDx() * joint.RzDz()).applyfunc(simplifier)
+            replacements, (reduced,) = sp.cse(current)
+            if use_cache:
+                _store_cse(key, replacements, reduced)
+
+        expanded = {}
+        for symbol, value in replacements:
+            expanded[symbol] = value.xreplace(expanded)
+        self.end_effector = reduced.xreplace(expanded)
+        return replacements, reduced
+
+    def params(self) -> np.ndarray:
+        """
+        Numeric DH values of the joints as an (N, 4) array.
+        """
+        return np.array([[float(v) for v in joint.values()] for joint in self.joints], dtype=np.float64).reshape(-1, 4)
+
+    def jacobian(self, joint_types: ty.Optional[str] = None,
+                 method: ty.Literal['analytic', 'numeric'] = 'analytic') -> np.ndarray:
+        """
+        6xN geometric Jacobian of the current configuration (see compile_jacobian and batch_jacobian).
+        """
+        joint_types = joint_types or 'R' * len(self.joints)
+        origin = np.array(sp.Matrix(self.origin), dtype=np.float64)
+        if method == 'numeric':
+            return batch_jacobian(self.params(), joint_types, origin=origin)
+        J = np.array(compile_jacobian(joint_types)(*self.params().ravel()), dtype=np.float64)
+        J[:3] = origin[:3, :3] @ J[:3]
+        J[3:] = origin[:3, :3] @ J[3:]
+        return J
+
     def length(self) -> int:
         return len(self.joints)
     
@@ -69,4 +489,86 @@ class JointChain:
         return sp.latex(expr)
     
     def evalf(self, expr, subs_dict={}):
-        return self.end_effector.evalf(subs=subs_dict)
\ No newline at end of file
+        return self.end_effector.evalf(subs=subs_dict)
+
+class ChainArray:
+    """
+    Structure-of-arrays joint chain for numeric work on many chains.
+    - params: (N, 4) contiguous float64 DH values (alfa, a, tita, d), angles in degrees
+    - frames: (N, 3, 4, 4) buffer with the P0, P1, P2 frames of every joint
+
+    The parameter, link and frame buffers are preallocated and reused by every compute(),
+    growing by doubling when joints are appended. joints and lines give DHParams / Line3D
+    views over the arrays for code written against JointChain.
+    """
+    def __init__(self, params: np.ndarray = None, capacity: int = 8, origin: np.ndarray = None):
+        params = np.zeros((0, 4)) if params is None else np.asarray(params, dtype=np.float64).reshape(-1, 4)
+        self.n = 0
+        self.origin = np.identity(4) if origin is None else np.asarray(origin, dtype=np.float64)
+        self._allocate(max(capacity, params.shape[0]))
+        for row in params:
+            self.append(row)
+
+    def _allocate(self, capacity: int):
+        params = np.zeros((capacity, 4))
+        frames = np.zeros((capacity, 3, 4, 4))
+        if self.n:
+            params[:self.n] = self._params[:self.n]
+            frames[:self.n] = self._frames[:self.n]
+        self._params = params
+        self._frames = frames
+        self._links = np.zeros((capacity, 2, 4, 4))
+
+    @property
+    def params(self) -> np.ndarray:
+        return self._params[:self.n]
+
+    @property
+    def frames(self) -> np.ndarray:
+        return self._frames[:self.n]
+
+    @property
+    def end_effector(self) -> np.ndarray:
+        return self._frames[self.n - 1, 2] if self.n else self.origin
+
+    @property
+    def joints(self) -> ty.List[JointView]:
+        return [JointView(row) for row in self.params]
+
+    @property
+    def lines(self) -> ty.List[Line3D]:
+        return [Line3D(f[0], f[1], f[2]) for f in self.frames]
+
+    def append(self, joint):
+        if self.n == self._params.shape[0]:
+            self._allocate(max(1, 2 * self.n))
+        self._params[self.n] = joint.values() if isinstance(joint, DHParams) else joint
+        self.n += 1
+
+    def set_joint(self, index: int, joint):
+        if index == self.n:
+            self.append(joint)
+        else:
+            self._params[index] = joint.values() if isinstance(joint, DHParams) else joint
+
+    def clear(self):
+        self.n = 0
+
+    def length(self) -> int:
+        return self.n
+
+    def compute(self):
+        n = self.n
+        if n == 0:
+            return
+        p = self._params[:n]
+        links = self._links[:n]
+        frames = self._frames[:n]
+        batch_RxDx(p[:, 0], p[:, 1], out=links[:, 0])
+        batch_RzDz(p[:, 2], p[:, 3], out=links[:, 1])
+        frames[0, 0] = self.origin
+        for i in range(n):
+            np.matmul(frames[i, 0], links[i, 0], out=frames[i, 1])
+            np.matmul(frames[i, 1], links[i, 1], out=frames[i, 2])
+            if i + 1 < n:
+                frames[i + 1, 0] = frames[i, 2]
@@ -0,0 +1,73 @@
+import numpy as np
+
+from backend.math.Functions import batch_RxDx, batch_RzDz
+
+import typing as ty
+
+def _natural_cubic_slopes(y: np.ndarray) -> np.ndarray:
+    """
+    First derivatives at the knots of the natural cubic spline through y (K, D), with unit knot spacing.
+    """
+    K = y.shape[0]
+    A = np.zeros((K, K))
+    b = np.zeros_like(y)
+    A[0, 0:2] = (2, 1)
+    A[-1, -2:] = (1, 2)
+    b[0] = 3 * (y[1] - y[0])
+    b[-1] = 3 * (y[-1] - y[-2])
+    for i in range(1, K - 1):
+        A[i, i-1:i+2] = (1, 4, 1)
+        b[i] = 3 * (y[i+1] - y[i-1])
+    return np.linalg.solve(A, b)
+
+def interpolate(waypoints: np.ndarray, n_frames: int,
+                method: ty.Literal['linear', 'cubic'] = 'linear') -> np.ndarray:
+    """
+    Sample n_frames configurations along joint-space waypoints (K, ...), evenly spaced in time
+    with one time unit per segment. Returns an (n_frames, ...) array.
+    - linear: piecewise linear interpolation
+    - cubic:  natural cubic spline (continuous velocity and acceleration)
+    """
+    waypoints = np.asarray(waypoints, dtype=np.float64)
+    K = waypoints.shape[0]
+    if K < 2:
+        raise ValueError("At least two waypoints are needed")
+    y = waypoints.reshape(K, -1)
+
+    t = np.linspace(0, K - 1, n_frames)
+    segment = np.minimum(t.astype(int), K - 2)
+    u = (t - segment)[:, None]
+    y0, y1 = y[segment], y[segment + 1]
+
+    if method == 'linear':
+        out = y0 + u * (y1 - y0)
+    elif method == 'cubic':
+        m = _natural_cubic_slopes(y)
+        m0, m1 = m[segment], m[segment + 1]
+        # cubic Hermite basis
+        h00 = 2*u**3 - 3*u**2 + 1
+        h10 = u**3 - 2*u**2 + u
+        h01 = -2*u**3 + 3*u**2
+        h11 = u**3 - u**2
+        out = h00*y0 + h10*m0 + h01*y1 + h11*m1
+    else:
+        raise ValueError(f"Unknown interpolation method '{method}'")
+    return out.reshape((n_frames,) + waypoints.shape[1:])
+
+def trajectory_frames(params: np.ndarray, origin: np.ndarray = None) -> ty.Tuple[np.ndarray, np.ndarray]:
+    """
+    Frames of every joint for F chain configurations params (F, N, 4), in one batched pass.
+    Returns (P1, P2), both (F, N, 4, 4): the frames after RxDx and after RzDz of each joint,
+    the same points as Line3D.P1 and Line3D.P2 of JointChain.
+    """
+    params = np.asarray(params, dtype=np.float64)
+    rxdx = batch_RxDx(params[..., 0], params[..., 1])
+    rzdz = batch_RzDz(params[..., 2], params[..., 3])
+    P1 = np.empty_like(rxdx)
+    P2 = np.empty_like(rzdz)
+    current = np.broadcast_to(np.identity(4) if origin is None else np.asarray(origin, dtype=np.float64),
+                              (params.shape[0], 4, 4))
+    for i in range(params.shape[1]):
+        current = np.matmul(current, rxdx[:, i], out=P1[:, i])
+        current = np.matmul(current, rzdz[:, i], out=P2[:, i])
+    return P1, P2
@@ -0,0 +1,144 @@
+import numpy as np
+
+from backend.math.Functions import batch_T, batch_chain, end_positions
+from backend.math.MathCore import geometric_jacobian
+
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import typing as ty
+
+# Columns of the GridJob results
+RESULT_COLUMNS = ('x', 'y', 'z', 'manipulability', 'condition')
+
+# Range of each DH parameter (alfa, a, tita, d), used for the Plot3DPage sliders
+DH_INTERVALS = ((-180, 180), (0, 100), (-180, 180), (0, 100))
+
+def sample_workspace(intervals: np.ndarray,
+                     n_samples: int,
+                     chunk_size: int = 65536,
+                     origin: np.ndarray = None,
+                     seed: ty.Optional[int] = None) -> ty.Iterator[np.ndarray]:
+    """
+    Sample chain configurations uniformly inside intervals (shape (N, 4, 2)) and
+    yield the end-effector positions in chunks of at most chunk_size points (shape (k, 3)).
+    Only one chunk lives in memory at a time, so n_samples can be arbitrarily large.
+    """
+    intervals = np.asarray(intervals, dtype=np.float64)
+    if intervals.ndim != 3 or intervals.shape[1:] != (4, 2):
+        raise ValueError("intervals must have shape (N, 4, 2)")
+    if intervals.shape[0] == 0:
+        return
+
+    rng = np.random.default_rng(seed)
+    low = intervals[..., 0]
+    span = intervals[..., 1] - low
+
+    remaining = int(n_samples)
+    while remaining > 0:
+        k = min(chunk_size, remaining)
+        params = low + span * rng.random((k,) + low.shape)
+        yield end_positions(params, origin)
+        remaining -= k
+
+def joint_grid(intervals: np.ndarray, steps: int, joint_types: ty.Optional[str] = None):
+    """
+    Grid over the joint variable of every joint (tita for 'R' joints, d for 'P' joints),
+    with steps values inside its interval. Returns (variables, axes) for GridJob.
+    """
+    intervals = np.asarray(intervals, dtype=np.float64)
+    joint_types = joint_types or 'R' * intervals.shape[0]
+    variables = [(i, 2 if kind == 'R' else 3) for i, kind in enumerate(joint_types)]
+    axes = [np.linspace(*intervals[i, column], steps) for i, column in variables]
+    return variables, axes
+
+def _grid_task(shm_name, shape, params, variables, axes, revolute, origin, start, stop, chunk_size):
+    """
+    Worker of GridJob: evaluate grid points start..stop and write them into the shared results.
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        out = np.ndarray(shape, dtype=np.float32, buffer=shm.buf)
+        counts = tuple(len(axis) for axis in axes)
+        for lo in range(start, stop, chunk_size):
+            hi = min(lo + chunk_size, stop)
+            index = np.unravel_index(np.arange(lo, hi), counts)
+            batch = np.repeat(params[None], hi - lo, axis=0)
+            for (joint, column), axis, idx in zip(variables, axes, index):
+                batch[:, joint, column] = axis[idx]
+
+            frames = batch_chain(batch_T(batch[..., 0], batch[..., 1], batch[..., 2], batch[..., 3]), origin)
+            s = np.linalg.svd(geometric_jacobian(frames, revolute, orientation=False), compute_uv=False)
+            out[lo:hi, :3] = frames[:, -1, :3, 3]
+            out[lo:hi, 3] = np.prod(s, axis=-1)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                out[lo:hi, 4] = s[:, 0] / s[:, -1]
+        del out
+    finally:
+        shm.close()
+
+class GridJob:
+    """
+    Reachability and dexterity analysis of a joint-space grid, split across a process pool.
+
+    - params:    (N, 4) DH values of the chain, the grid variables are overwritten per point
+    - variables: list of (joint, column) DH entries spanned by the grid (column 2 = tita, 3 = d)
+    - axes:      values of each grid variable (see joint_grid)
+
+    Workers write straight into a shared memory block, so no results are pickled.
+    results is an (S, 5) float32 array of RESULT_COLUMNS in C order of the grid axes, with the
+    manipulability and condition number of the position Jacobian. It is a view of the shared block,
+    so it is only valid until close(); wait() returns a copy.
+    """
+    def __init__(self, params: np.ndarray, variables, axes,
+                 joint_types: ty.Optional[str] = None,
+                 origin: np.ndarray = None,
+                 workers: ty.Optional[int] = None,
+                 task_size: int = 1 << 20,
+                 chunk_size: int = 16384):
+        params = np.asarray(params, dtype=np.float64)
+        axes = [np.asarray(axis, dtype=np.float64) for axis in axes]
+        joint_types = joint_types or 'R' * params.shape[0]
+        revolute = np.array([kind == 'R' for kind in joint_types])
+        origin = np.identity(4) if origin is None else np.asarray(origin, dtype=np.float64)
+
+        self.size = int(np.prod([len(axis) for axis in axes]))
+        shape = (self.size, len(RESULT_COLUMNS))
+        self.shm = shared_memory.SharedMemory(create=True, size=max(1, self.size * len(RESULT_COLUMNS) * 4))
+        self.results = np.ndarray(shape, dtype=np.float32, buffer=self.shm.buf)
+
+        self.executor = ProcessPoolExecutor(max_workers=workers)
+        self.futures = [self.executor.submit(_grid_task, self.shm.name, shape, params, variables, axes,
+                                             revolute, origin, start, min(start + task_size, self.size), chunk_size)
+                        for start in range(0, self.size, task_size)]
+        self.executor.shutdown(wait=False)
+
+    def progress(self) -> float:
+        if not self.futures:
+            return 1.0
+        return sum(future.done() for future in self.futures) / len(self.futures)
+
+    def done(self) -> bool:
+        return all(future.done() for future in self.futures)
+
+    def wait(self) -> np.ndarray:
+        """
+        Wait for all workers and return a copy of the results, which stays valid after close().
+        """
+        if self.results is None:
+            raise RuntimeError("GridJob is closed, its results are only available through an earlier wait()")
+        for future in self.futures:
+            future.result()
+        return self.results.copy()
+
+    def close(self):
+        """
+        Stop the workers and free the shared block. Calling it again does nothing.
+        """
+        if self.results is None:
+            return
+        for future in self.futures:
+            future.cancel()
+        self.executor.shutdown(wait=True)
+        self.results = None
+        self.shm.close()
+        self.shm.unlink()
@@ -0,0 +1,176 @@
+"""
+Headless rendering and frame-sequence export of the plotting pages.
+
+Frames are rendered on the main thread (GL and matplotlib need it) and handed to a thread pool
+that encodes and writes them, so disk and PNG encoding overlap with rendering the next frame.
+
+From the command line:
+
+    python -m frontend.Export emwave t 0 360 --frames 72 --out frames
+
+writes frames/scene_00000.png ... and frames/polarization_00000.png ... for t = 0 .. 360.
+No window is opened, but the GL context still needs a display server: with Qt 5 the offscreen
+platform gets its OpenGL context through GLX. On a Linux machine without a display (CI), run it
+under a virtual X server with a software GL such as Mesa llvmpipe:
+
+    xvfb-run -a python -m frontend.Export emwave t 0 360 --frames 72 --out frames
+"""
+
+import numpy as np
+
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtCore import Qt, QCoreApplication
+from PyQt5.QtGui import QImage, QOpenGLContext, QOffscreenSurface
+
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import collections
+import importlib
+import os
+import sys
+import typing as T
+
+# page name -> (module, class, method that redraws the page)
+PAGES = {
+    'emwave': ('frontend.pages.EMWavePage', 'EMWavePage', 'update_plot'),
+    'plot3d': ('frontend.pages.Plot3DPage', 'Plot3DPage', 'render'),
+}
+
+def setup_headless() -> QApplication:
+    """
+    Create the QApplication for rendering without opening windows: offscreen platform and software GL
+    (Mesa through LIBGL_ALWAYS_SOFTWARE, AA_UseSoftwareOpenGL on Windows). On Linux the offscreen
+    platform still needs an X display for its GLX context, see gl_available().
+    Must be called before any other QApplication is created.
+    """
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    os.environ.setdefault("LIBGL_ALWAYS_SOFTWARE", "1")
+    app = QApplication.instance()
+    if app is None:
+        QCoreApplication.setAttribute(Qt.AA_UseSoftwareOpenGL)
+        QCoreApplication.setAttribute(Qt.AA_ShareOpenGLContexts)
+        app = QApplication(sys.argv[:1])
+    return app
+
+def gl_available() -> bool:
+    """
+    Whether an OpenGL context can be created and made current on the current Qt platform.
+    Needs a QApplication (see setup_headless).
+    """
+    context = QOpenGLContext()
+    if not context.create():
+        return False
+    surface = QOffscreenSurface()
+    surface.setFormat(context.format())
+    surface.create()
+    if not (surface.isValid() and context.makeCurrent(surface)):
+        return False
+    context.doneCurrent()
+    return True
+
+def figure_image(figure) -> np.ndarray:
+    """
+    Draw a matplotlib figure now (instead of the canvas' draw_idle) and return it as an (h, w, 4) RGBA array.
+    """
+    figure.canvas.draw()
+    return np.asarray(figure.canvas.buffer_rgba()).copy()
+
+def write_image(path: str, frame: T.Union[QImage, np.ndarray]):
+    if isinstance(frame, np.ndarray):
+        frame = np.ascontiguousarray(frame, dtype=np.uint8)
+        h, w = frame.shape[:2]
+        image = QImage(frame.data, w, h, frame.strides[0], QImage.Format_RGBA8888)
+    else:
+        image = frame
+    if not image.save(path):
+        raise OSError(f"Could not write {path}")
+
+class FrameWriter:
+    """
+    Writes numbered frames ({name}_{index:05d}.png in out_dir) from a thread pool.
+    A frame is a QImage or an (h, w, 4) RGBA uint8 array. At most max_pending frames wait
+    in memory; submit() blocks on the oldest one beyond that. Errors are raised by submit() or close().
+    """
+    def __init__(self, out_dir: str, workers: int = 4, max_pending: T.Optional[int] = None, extension: str = "png"):
+        os.makedirs(out_dir, exist_ok=True)
+        self.out_dir = out_dir
+        self.extension = extension
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.max_pending = max_pending or 2 * workers
+        self.pending = collections.deque()
+        self.paths = []
+
+    def submit(self, name: str, index: int, frame: T.Union[QImage, np.ndarray]) -> str:
+        while len(self.pending) >= self.max_pending:
+            self.pending.popleft().result()
+        path = os.path.join(self.out_dir, f"{name}_{index:05d}.{self.extension}")
+        self.pending.append(self.executor.submit(write_image, path, frame))
+        self.paths.append(path)
+        return path
+
+    def close(self):
+        try:
+            while self.pending:
+                self.pending.popleft().result()
+        finally:
+            self.executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def export_sweep(page, update: T.Callable[[], None], name: str, values, out_dir: str,
+                 size=(800, 600), workers: int = 4) -> T.List[str]:
+    """
+    Set parameter name of page to each of values, redraw it with update() and write the frames:
+    scene_XXXXX from page.plot3d_widget and, when the page has one, polarization_XXXXX from page.pol_figure.
+    Returns the written paths.
+    """
+    figure = getattr(page, 'pol_figure', None)
+    with FrameWriter(out_dir, workers=workers) as writer:
+        for i, value in enumerate(values):
+            page.paramList[name] = value
+            update()
+            writer.submit('scene', i, page.plot3d_widget.render_image(size))
+            if figure is not None:
+                writer.submit('polarization', i, figure_image(figure))
+    return writer.paths
+
+def create_page(page_name: str):
+    """
+    Build a page outside of the MainWindow, the same way MainWindow does.
+    """
+    from backend.MainModel import MainModel
+    module, cls, _ = PAGES[page_name]
+    page = getattr(importlib.import_module(module), cls)()
+    page.set_model(MainModel())
+    page.initUI(page.layout)
+    page.setLayout(page.layout)
+    return page
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export a parameter sweep of a page as image sequences.")
+    parser.add_argument("page", choices=sorted(PAGES))
+    parser.add_argument("param", help="name of the swept parameter, e.g. t")
+    parser.add_argument("start", type=float)
+    parser.add_argument("stop", type=float)
+    parser.add_argument("--frames", type=int, default=60)
+    parser.add_argument("--out", default="frames")
+    parser.add_argument("--size", type=int, nargs=2, default=(800, 600), metavar=("W", "H"))
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args(argv)
+
+    app = setup_headless()
+    if not gl_available():
+        parser.exit(1, "No OpenGL context available. Without a display, run the export under a virtual "
+                       "X server, e.g. xvfb-run -a python -m frontend.Export ...\n")
+    page = create_page(args.page)
+    update = getattr(page, PAGES[args.page][2])
+    paths = export_sweep(page, update, args.param, np.linspace(args.start, args.stop, args.frames),
+                         args.out, size=tuple(args.size), workers=args.workers)
+    print(f"Wrote {len(paths)} frames to {args.out}")
+
+if __name__ == '__main__':
+    main()
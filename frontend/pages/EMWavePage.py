@@ -3,14 +3,54 @@ import numpy as np
 from frontend.pages.BaseClassPage import BaseClassPage
 from frontend.widgets.PyQt3DPlot import PyQt3DPlot
 from frontend.widgets.DynamicSettingsWidget import DynamicSettingsWidget
+from frontend.widgets.BasicWidgets import Button, SwitchButton
 
 from PyQt5.QtWidgets import QHBoxLayout, QVBoxLayout, QSizePolicy, QWidget
+from PyQt5.QtCore import Qt, QTimer
 
 from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
 
 from utils.ParamList import ParameterList, NumParam, BoolParam
 
+import colorsys
+
+ANIMATION_FPS = 60
+ANIMATION_SPEED = 90         # degrees of t per second
+POLARIZATION_EVERY = 4       # animation ticks per redraw of the polarization plot
+
+# z sampling of the curves, scaled by the quality parameter
+SAMPLES_PER_WAVELENGTH = 16  # for a smooth curve, when the screen can show it
+MIN_SAMPLES_PER_WAVELENGTH = 4   # always, so fast waves do not alias
+PIXELS_PER_SAMPLE = 3
+MIN_SAMPLES = 32
+MAX_SAMPLES = 20000
+THIN_VECTORS = 300           # vectors drawn per wave when the comb is thinned, every k-th sample
+RESAMPLE_CHANGE = 0.25       # relative change of the sample count that makes a camera move resample
+
+# columns of the wave table, one row of parameters per wave
+WAVE_COLUMNS = ('E0', 'beta', 'alpha', 'phi')
+SUM_COLOR = (1.0, 1.0, 0.0, 1.0)
+
+def wave_color(k: int):
+    """
+    RGBA color of wave k (0-based): red and green for the first two, then spread around the hue circle.
+    """
+    if k < 2:
+        return ((1.0, 0.0, 0.0, 1.0), (0.0, 1.0, 0.0, 1.0))[k]
+    return colorsys.hsv_to_rgb((0.55 + 0.382 * (k - 2)) % 1.0, 0.8, 1.0) + (1.0,)
+
+def wave_phasors(table: np.ndarray, z_values: np.ndarray) -> np.ndarray:
+    """
+    Complex phasors (K, 2, N) of the (x, y) fields of K waves along N z values, in one broadcast.
+    table has shape (K, 4) with the WAVE_COLUMNS of each wave, angles in degrees.
+    Wave k is E0 e^{j(phi - beta z)} (cos alpha, sin alpha) and its field at time t is Re(phasor e^{j omega t}).
+    """
+    E0, beta, alpha, phi = np.asarray(table, dtype=np.float64).reshape(-1, 4).T
+    alpha = np.deg2rad(alpha)
+    amplitude = E0[:, None] * np.exp(1j * (np.deg2rad(phi)[:, None] - beta[:, None] * z_values[None, :]))
+    direction = np.stack([np.cos(alpha), np.sin(alpha)], axis=1)
+    return direction[:, :, None] * amplitude[:, None, :]
 
 class EMWavePage(BaseClassPage):
     title = "EM Waves"
@@ -22,31 +62,40 @@ class EMWavePage(BaseClassPage):
         self.paramList.addParameters([
             NumParam(name="t", text="time", default=0, step=1, interval=(0, 360)),
             NumParam(name="z_max", text="z max", default=0.1, step=0.1, interval=(0.1, 80)),
-
-            NumParam(name="alpha_1", text="Wave 1 alpha (deg)", default=0, step=15, interval=(0, 360)),
-
-            NumParam(name="E0_2", text="Wave 2 E0", default=1.0, step=0.1, interval=(0, 10)),
-            NumParam(name="beta_2", text="Wave 2 beta", default=1.0, step=0.1, interval=(0.1, 10.0)),
-            NumParam(name="alpha_2", text="Wave 2 alpha (deg)", default=90, step=15, interval=(0, 360)),
-            NumParam(name="phi_2", text="Wave 2 phase (deg)", default=0, step=15, interval=(0, 360)),
-
-            BoolParam(name="show_w2", text="Show Wave 2", default=True),
+            NumParam(name="quality", text="sampling quality", default=1.0, step=0.25, interval=(0.25, 4)),
             BoolParam(name="show_sum", text="Show Sum", default=True),
+            # the comb has a vector at every z sample unless thinned
+            BoolParam(name="thin_vectors", text="Thin Vectors", default=False),
         ])
+        self.waves = 0
+        self.add_wave()
+        self.add_wave(alpha=90)
 
         self.dynamicSettings = DynamicSettingsWidget(
             self.paramList,
-            on_edit=self.update_plot,
+            on_edit=self.schedule_update,
             submit_on_slider_move=True,
             enable_scroll_area=True,
             vertical=True,
         )
         self.dynamicSettings.setSizePolicy(QSizePolicy.Minimum, QSizePolicy.Minimum)
 
+        addWaveBtn = Button("Add Wave")
+        addWaveBtn.clicked.connect(self.on_add_wave)
+
+        # time animation, t runs on from the slider value while playing
+        self.animateBtn = SwitchButton("Pause", "Play", on_click=self.on_animate)
+        self.animation_timer = QTimer(self)
+        self.animation_timer.setTimerType(Qt.PreciseTimer)
+        self.animation_timer.timeout.connect(self.on_animation_tick)
+        self.anim_t = self.paramList["t"]
+        self.anim_tick = 0
+
         self.plot3d_widget = PyQt3DPlot()
         self.plot3d_widget.add_grid(size=2)
         # self.plot3d_widget.plot_axis(name="", length=5, permanent=True)
         self.plot3d_widget.w.setCameraPosition(distance=55, azimuth=45, elevation=18)
+        self.plot3d_widget.w.cameraChanged.connect(self.on_camera_changed)
 
         self.polarization_widget = QWidget()
         pol_layout = QVBoxLayout(self.polarization_widget)
@@ -58,7 +107,12 @@ class EMWavePage(BaseClassPage):
         pol_layout.addWidget(self.pol_canvas)
         self.polarization_widget.setMinimumHeight(220)
 
+        buttons = QHBoxLayout()
+        buttons.addWidget(self.animateBtn)
+        buttons.addWidget(addWaveBtn)
+
         right_panel = QVBoxLayout()
+        right_panel.addLayout(buttons)
         right_panel.addWidget(self.dynamicSettings)
         right_panel.addWidget(self.polarization_widget)
 
@@ -69,15 +123,59 @@ class EMWavePage(BaseClassPage):
 
         self.update_plot()
 
-    def compute_wave(self, E0, beta, alpha_deg, phi_deg, t_deg, z_values):
-        t_rad = np.deg2rad(t_deg)
-        alpha_rad = np.deg2rad(alpha_deg)
-        phi_rad = np.deg2rad(phi_deg)
-
-        magnitude = E0 * np.cos(self.omega * t_rad - beta * z_values + phi_rad)
-        ex = magnitude * np.cos(alpha_rad)
-        ey = magnitude * np.sin(alpha_rad)
-        return ex, ey
+    def add_wave(self, E0=1.0, beta=1.0, alpha=0, phi=0):
+        """
+        Append a row to the wave table: the parameters E0_k, beta_k, alpha_k, phi_k and show_k of wave k.
+        show_2 is the former show_w2 of the two-wave page, which had no switch for wave 1.
+        """
+        k = self.waves + 1
+        self.paramList.addParameters([
+            NumParam(name=f"E0_{k}", text=f"Wave {k} E0", default=E0, step=0.1, interval=(0, 10)),
+            NumParam(name=f"beta_{k}", text=f"Wave {k} beta", default=beta, step=0.1, interval=(0.1, 10.0)),
+            NumParam(name=f"alpha_{k}", text=f"Wave {k} alpha (deg)", default=alpha, step=15, interval=(0, 360)),
+            NumParam(name=f"phi_{k}", text=f"Wave {k} phase (deg)", default=phi, step=15, interval=(0, 360)),
+            BoolParam(name=f"show_{k}", text=f"Show Wave {k}", default=True),
+        ])
+        self.waves += 1
+
+    def on_add_wave(self):
+        self.add_wave()
+        # keep the widget's own title, updateUI would otherwise add its default header
+        self.dynamicSettings.updateUI(self.paramList, self.dynamicSettings.title)
+        self.schedule_update()
+
+    def wave_table(self):
+        """
+        Returns (table, shown): the (K, 4) WAVE_COLUMNS of every wave and the (K,) mask of the shown ones.
+        """
+        table = np.array([[self.paramList[f"{column}_{k}"] for column in WAVE_COLUMNS]
+                          for k in range(1, self.waves + 1)], dtype=np.float64).reshape(-1, 4)
+        shown = np.array([bool(self.paramList[f"show_{k}"]) for k in range(1, self.waves + 1)], dtype=bool)
+        return table, shown
+
+    def z_samples(self, beta_max: float) -> int:
+        """
+        Number of z samples of the curves over [0, z_max]: SAMPLES_PER_WAVELENGTH of the shortest
+        wavelength, but no more than one per PIXELS_PER_SAMPLE of the on-screen length of the z range,
+        scaled by quality, and never under MIN_SAMPLES_PER_WAVELENGTH. Capped to MAX_SAMPLES.
+        """
+        z_max = float(self.paramList["z_max"])
+        cycles = z_max * beta_max / (2 * np.pi)
+        visible = self.plot3d_widget.screen_length((0, 0, 0), (0, 0, z_max)) / PIXELS_PER_SAMPLE
+        n = max(self.paramList["quality"] * min(cycles * SAMPLES_PER_WAVELENGTH, visible),
+                cycles * MIN_SAMPLES_PER_WAVELENGTH)
+        return int(np.clip(np.ceil(n), MIN_SAMPLES, MAX_SAMPLES))
+
+    def on_camera_changed(self):
+        # zooming changes the on-screen length of the curves, and with it their sample count
+        table, _ = self.wave_table()
+        n = self.z_samples(table[:, 1].max(initial=0.0))
+        if abs(n - len(self.z_values)) > RESAMPLE_CHANGE * len(self.z_values):
+            self.schedule_update()
+
+    def schedule_update(self):
+        # slider drags are coalesced into one redraw per display frame, with the latest values
+        self.plot3d_widget.schedule(self.update_plot)
 
     def _build_vectors(self, ex, ey, z_values):
         starts = np.column_stack((np.zeros_like(z_values), np.zeros_like(z_values), z_values))
@@ -87,56 +185,45 @@ class EMWavePage(BaseClassPage):
     def _build_curve(self, ex, ey, z_values):
         return np.column_stack((ex, ey, z_values))
 
-    def _plot_signal(self, ex, ey, z_values, color, width_line=2, width_vector=3):
+    def _plot_signal(self, key, ex, ey, z_values, color, width_line=2, width_vector=3):
+        # items are retained under key, so redraws only update their data
         curve = self._build_curve(ex, ey, z_values)
-        self.plot3d_widget.plot_line_strip(curve, color=color, width=width_line)
-
-        # Keep a single representative vector at z=0.
-        starts, ends = self._build_vectors(ex[:1], ey[:1], z_values[:1])
-        self.plot3d_widget.plot_vectors(starts, ends, color=color, width=width_vector)
+        self.plot3d_widget.plot_line_strip(curve, color=color, width=width_line, key=(key, 'curve'))
+
+        # The E-field vector comb along z, drawn as one arrow item.
+        stride = self.vector_stride
+        starts, ends = self._build_vectors(ex[::stride], ey[::stride], z_values[::stride])
+        self.plot3d_widget.plot_arrows(starts, ends, color=color, width=width_vector, key=(key, 'vector'))
+
+    def _plot_waves(self, fields, colors, z_values, width_line=2, width_vector=3):
+        """
+        Curves and vector combs of the (S, 2, N) component fields, all waves in one line item and one arrow item.
+        """
+        S, _, N = fields.shape
+        points = np.empty((S, N, 3))
+        points[..., 0] = fields[:, 0]
+        points[..., 1] = fields[:, 1]
+        points[..., 2] = z_values
+        self.plot3d_widget.plot_vectors(points[:, :-1].reshape(-1, 3), points[:, 1:].reshape(-1, 3),
+                                        color=np.repeat(colors, N - 1, axis=0), width=width_line,
+                                        key=('waves', 'curve'))
+        ends = points[:, ::self.vector_stride]
+        starts = np.zeros_like(ends)
+        starts[..., 2] = ends[..., 2]
+        self.plot3d_widget.plot_arrows(starts.reshape(-1, 3), ends.reshape(-1, 3),
+                                       color=np.repeat(colors, ends.shape[1], axis=0), width=width_vector,
+                                       key=('waves', 'vector'))
 
     def _plot_polarization_xy(self, t_deg):
         t_values = np.linspace(0.0, 360.0, 240)
-        z0 = np.zeros_like(t_values)
-
-        ex1_curve, ey1_curve = self.compute_wave(
-            E0=1.0,
-            beta=1.0,
-            alpha_deg=self.paramList["alpha_1"],
-            phi_deg=0,
-            t_deg=t_values,
-            z_values=z0,
-        )
-        ex1_now, ey1_now = self.compute_wave(
-            E0=1.0,
-            beta=1.0,
-            alpha_deg=self.paramList["alpha_1"],
-            phi_deg=0,
-            t_deg=t_deg,
-            z_values=np.array([0.0]),
-        )
+        rotors = np.exp(1j * self.omega * np.deg2rad(t_values))
 
-        ex2_curve, ey2_curve = self.compute_wave(
-            E0=self.paramList["E0_2"],
-            beta=self.paramList["beta_2"],
-            alpha_deg=self.paramList["alpha_2"],
-            phi_deg=self.paramList["phi_2"],
-            t_deg=t_values,
-            z_values=z0,
-        )
-        ex2_now, ey2_now = self.compute_wave(
-            E0=self.paramList["E0_2"],
-            beta=self.paramList["beta_2"],
-            alpha_deg=self.paramList["alpha_2"],
-            phi_deg=self.paramList["phi_2"],
-            t_deg=t_deg,
-            z_values=np.array([0.0]),
-        )
-
-        ex_sum_curve = ex1_curve + ex2_curve
-        ey_sum_curve = ey1_curve + ey2_curve
-        ex_sum_now = ex1_now + ex2_now
-        ey_sum_now = ey1_now + ey2_now
+        # every wave at z = 0 over one period, (K, 2, T), and the sum in one reduction
+        table, shown = self.wave_table()
+        at_origin = wave_phasors(table, np.zeros(1))[:, :, 0]
+        curves = (at_origin[:, :, None] * rotors).real
+        sum_curve = curves.sum(axis=0)
+        now = (at_origin * np.exp(1j * self.omega * np.deg2rad(t_deg))).real
 
         self.pol_ax.clear()
         self.pol_ax.axhline(0, color='0.4', linewidth=0.8)
@@ -147,67 +234,93 @@ class EMWavePage(BaseClassPage):
         self.pol_ax.set_ylabel('Ex')
         self.pol_ax.set_title('Polarization Plane (y right, x up, z in)')
 
-        self.pol_ax.plot(ey1_curve, ex1_curve, color=(1.0, 0.0, 0.0), linewidth=1.6, linestyle='--', label='Wave 1')
-        self.pol_ax.quiver(0, 0, ey1_now[0], ex1_now[0], angles='xy', scale_units='xy', scale=1,
-                           color=(1.0, 0.0, 0.0), width=0.007)
-
-        if self.paramList["show_w2"]:
-            self.pol_ax.plot(ey2_curve, ex2_curve, color=(0, 1, 0), linewidth=1.6, linestyle='--', label='Wave 2')
-            self.pol_ax.quiver(0, 0, ey2_now[0], ex2_now[0], angles='xy', scale_units='xy', scale=1,
-                               color=(0.0, 1.0, 0.0), width=0.007)
+        # the quivers are kept to be moved by the animation
+        self.pol_quivers = {}
+        for k in np.flatnonzero(shown):
+            self.pol_ax.plot(curves[k, 1], curves[k, 0], color=wave_color(k)[:3], linewidth=1.6, linestyle='--',
+                             label=f'Wave {k + 1}')
+        if shown.any():
+            self.pol_quivers['waves'] = self.pol_ax.quiver(
+                np.zeros(shown.sum()), np.zeros(shown.sum()), now[shown, 1], now[shown, 0],
+                angles='xy', scale_units='xy', scale=1,
+                color=[wave_color(k) for k in np.flatnonzero(shown)], width=0.007)
 
         if self.paramList["show_sum"]:
-            self.pol_ax.plot(ey_sum_curve, ex_sum_curve, color=(0.0, 0.0, 1.0), linewidth=2.0, label='Sum')
-            self.pol_ax.quiver(0, 0, ey_sum_now[0], ex_sum_now[0], angles='xy', scale_units='xy', scale=1,
-                               color=(0.0, 0.0, 1.0), width=0.009)
-
-        max_abs = np.max(np.abs(np.concatenate([
-            ex1_curve, ey1_curve,
-            ex2_curve, ey2_curve,
-            ex_sum_curve, ey_sum_curve
-        ])))
+            self.pol_ax.plot(sum_curve[1], sum_curve[0], color=SUM_COLOR[:3], linewidth=2.0, label='Sum')
+            total = now.sum(axis=0)
+            self.pol_quivers['sum'] = self.pol_ax.quiver(0, 0, total[1], total[0], angles='xy', scale_units='xy',
+                                                         scale=1, color=SUM_COLOR, width=0.009)
+
+        max_abs = max(np.max(np.abs(curves), initial=0.0), np.max(np.abs(sum_curve)))
         lim = max(1.5, float(max_abs) * 1.15)
         self.pol_ax.set_xlim(-lim, lim)
         self.pol_ax.set_ylim(-lim, lim)
         self.pol_ax.set_aspect('equal', adjustable='box')
-        self.pol_ax.legend(loc='upper right', fontsize=8)
+        if self.pol_ax.get_legend_handles_labels()[0]:
+            self.pol_ax.legend(loc='upper right', fontsize=8)
         self.pol_canvas.draw_idle()
 
     def update_plot(self):
-        self.plot3d_widget.clear()
-
-        t = self.paramList["t"]
-        z_max = self.paramList["z_max"]
-        n_pts = 300
-        z_values = np.linspace(0.0, float(z_max), n_pts)
-
-        ex1, ey1 = self.compute_wave(
-            E0=1.0,
-            beta=1.0,
-            alpha_deg=self.paramList["alpha_1"],
-            phi_deg=0,
-            t_deg=t,
-            z_values=z_values,
-        )
-
-        ex2, ey2 = self.compute_wave(
-            E0=self.paramList["E0_2"],
-            beta=self.paramList["beta_2"],
-            alpha_deg=self.paramList["alpha_2"],
-            phi_deg=self.paramList["phi_2"],
-            t_deg=t,
-            z_values=z_values,
-        )
-
-        self._plot_signal(ex1, ey1, z_values, color=(1.0, 0.0, 0.0, 1.0), width_line=2, width_vector=3)
-
-        if self.paramList["show_w2"]:
-            self._plot_signal(ex2, ey2, z_values, color=(0.0, 1.0, 0.0, 1.0), width_line=2, width_vector=3)
-
-        if self.paramList["show_sum"]:
-            ex_sum = ex1 + ex2
-            ey_sum = ey1 + ey2
-            self._plot_signal(ex_sum, ey_sum, z_values, color=(1.0, 1.0, 0.0, 1.0), width_line=3, width_vector=4)
-
+        self.plot3d_widget.begin_frame()
+
+        t = self.anim_t if self.animation_timer.isActive() else self.paramList["t"]
+        table, self.shown = self.wave_table()
+        # sampled for the fastest wave, every wave contributes to the sum
+        n_pts = self.z_samples(table[:, 1].max(initial=0.0))
+        self.z_values = np.linspace(0.0, float(self.paramList["z_max"]), n_pts)
+        self.vector_stride = -(-n_pts // THIN_VECTORS) if self.paramList["thin_vectors"] else 1
+
+        # the phasors only change with the wave parameters, time is applied by the rotor e^{j omega t}.
+        # Rows are the shown waves followed by the sum of all waves.
+        phasors = wave_phasors(table, self.z_values)
+        self.phasors = np.concatenate([phasors[self.shown], phasors.sum(axis=0, keepdims=True)])
+        self.colors = np.array([wave_color(k) for k in np.flatnonzero(self.shown)], dtype=np.float32).reshape(-1, 4)
+        self.rotor = np.exp(1j * self.omega * np.deg2rad(t))
+
+        self._plot_fields()
         self.plot3d_widget.show()
         self._plot_polarization_xy(t)
+
+    def _plot_fields(self):
+        # (S + 1, 2, n) fields at the current time in one complex multiply
+        fields = (self.phasors * self.rotor).real
+        if self.shown.any():
+            self._plot_waves(fields[:-1], self.colors, self.z_values)
+        if self.paramList["show_sum"]:
+            self._plot_signal('sum', fields[-1, 0], fields[-1, 1], self.z_values,
+                              color=SUM_COLOR, width_line=3, width_vector=4)
+        return fields
+
+    def on_animate(self, is_on):
+        if is_on:
+            self.anim_t = self.paramList["t"]
+            self.anim_tick = 0
+            self.animation_timer.start(round(1000 / ANIMATION_FPS))
+            self.update_plot()
+        else:
+            self.animation_timer.stop()
+            # the slider continues from where the animation paused
+            self.paramList["t"] = round(self.anim_t)
+            self.dynamicSettings.refreshValues()
+            self.update_plot()
+
+    def on_animation_tick(self):
+        """
+        Advance time by one frame: the rotor is multiplied by e^{j omega dt} and the existing
+        items are updated in place, no cosine is evaluated per sample.
+        """
+        dt = ANIMATION_SPEED / ANIMATION_FPS
+        self.anim_t = (self.anim_t + dt) % 360
+        self.rotor *= np.exp(1j * self.omega * np.deg2rad(dt))
+        self.rotor /= abs(self.rotor)
+        fields = self._plot_fields()
+
+        # matplotlib is too slow for every frame, only the field vectors at z = 0 move
+        self.anim_tick += 1
+        if self.anim_tick % POLARIZATION_EVERY == 0:
+            now = fields[:, :, 0]
+            if 'waves' in self.pol_quivers:
+                self.pol_quivers['waves'].set_UVC(now[:-1, 1], now[:-1, 0])
+            if 'sum' in self.pol_quivers:
+                self.pol_quivers['sum'].set_UVC(now[-1, 1], now[-1, 0])
+            self.pol_canvas.draw_idle()
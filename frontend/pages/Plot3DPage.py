@@ -1,33 +1,92 @@
 from frontend.pages.BaseClassPage import BaseClassPage
 from PyQt5.QtWidgets import QHBoxLayout, QVBoxLayout, QSizePolicy, QWidget
+from PyQt5.QtCore import QTimer
 
-from frontend.widgets.PyQt3DPlot import PyQt3DPlot
+from frontend.widgets.PyQt3DPlot import PyQt3DPlot, segment_transforms
 from frontend.widgets.SympyLatexWidget import SympyLatexWidget
-from frontend.widgets.BasicWidgets import Slider, Button
+from frontend.widgets.BasicWidgets import Slider, Button, NumberInput, SwitchButton
 from frontend.widgets.DynamicSettingsWidget import DynamicSettingsWidget
-from utils.ParamList import ParameterList, NumParam
+from utils.ParamList import ParameterList, NumParam, BoolParam
 
 from backend.math.MathCore import JointChain, DHParams, Line3D
+from backend.math.Workspace import sample_workspace, joint_grid, GridJob, DH_INTERVALS
+from backend.math.InverseKinematics import solve_ik
+from backend.math.Trajectory import interpolate, trajectory_frames
 
 import sympy as sp
 import numpy as np
 
+import logging
+
+log = logging.getLogger(__name__)
+
+PLAYBACK_FPS = 30
+LINK_RADIUS = 1.5
+JOINT_SIZE = (4, 4, 6, 1)     # box scale along the joint frame axes
+SEGMENT_SECONDS = 2
+TITA_DECIMALS = 1               # resolution of the joint angle inputs, which show the IK solutions
+
 class Plot3DPage(BaseClassPage):
     title = "3D Plot"
     
     def initUI(self, layout):
         renderTexBtn = Button("Render Latex")
         renderTexBtn.clicked.connect(self.render_latex)
+        # the rendered end effector keeps the DH symbols or takes the current slider values
+        self.symbolicBtn = SwitchButton("Symbolic", "Numeric", on_click=lambda v: None, value=False)
+
+        workspaceBtn = Button("Sample Workspace")
+        workspaceBtn.clicked.connect(self.sample_workspace)
+        self.samplesInput = NumberInput("samples (10^n)", interval=(3, 7), step=1, default=6)
+
+        gridBtn = Button("Grid Analysis")
+        gridBtn.clicked.connect(self.grid_analysis)
+        self.grid_job = None
+        self.grid_timer = QTimer(self)
+        self.grid_timer.timeout.connect(self.on_grid_poll)
+
+        self.workspace_cloud = None
+        self.workspace_samples = None
+        self.workspace_timer = QTimer(self)
+        self.workspace_timer.timeout.connect(self.on_workspace_chunk)
+
+        # joint-space trajectory playback
+        self.waypoints = []
+        waypointBtn = Button("Add Waypoint")
+        waypointBtn.clicked.connect(self.add_waypoint)
+        clearWaypointsBtn = Button("Clear Waypoints")
+        clearWaypointsBtn.clicked.connect(self.clear_waypoints)
+        self.cubicBtn = SwitchButton("Cubic", "Linear", on_click=lambda v: None, value=True)
+        self.playBtn = SwitchButton("Stop", "Play", on_click=self.on_play)
+        # links as cylinders and joints as boxes instead of lines
+        self.meshBtn = SwitchButton("Mesh", "Lines", on_click=lambda is_on: self.schedule_render(), value=False)
+        self.playback_timer = QTimer(self)
+        self.playback_timer.timeout.connect(self.on_playback_tick)
 
         self.paramList = ParameterList()
         self.joints = 0
+        # kept between computes so only the edited joints onward are recomputed
+        self.chain = JointChain(mode='numeric')
 
-        self.dynamicSettings = DynamicSettingsWidget(self.paramList, on_edit=self.render, 
+        self.dynamicSettings = DynamicSettingsWidget(self.paramList, on_edit=self.schedule_render, 
                                                      submit_on_slider_move=True,
                                                      enable_scroll_area=False,
                                                      vertical=False)
         self.dynamicSettings.setSizePolicy(QSizePolicy.Minimum, QSizePolicy.Minimum)
 
+        # IK target frame, dragging its sliders solves the chain and writes the joints back
+        self.targetList = ParameterList([
+            BoolParam(name="ik", text="IK", default=False),
+            NumParam(name="target_x", text="target x", default=20, step=1, interval=(-200, 200)),
+            NumParam(name="target_y", text="target y", default=0, step=1, interval=(-200, 200)),
+            NumParam(name="target_z", text="target z", default=20, step=1, interval=(-200, 200)),
+        ])
+        self.target_edited = False      # solve the IK in the next render
+        self.targetSettings = DynamicSettingsWidget(self.targetList, on_edit=self.schedule_target_edit,
+                                                    submit_on_slider_move=True,
+                                                    enable_scroll_area=False,
+                                                    vertical=False)
+        self.targetSettings.setSizePolicy(QSizePolicy.Minimum, QSizePolicy.Minimum)
 
         self.latex_widget = SympyLatexWidget()
         self.latex_widget.show()
@@ -41,6 +100,18 @@ class Plot3DPage(BaseClassPage):
         hvlayout = QVBoxLayout()
         
         hvlayout.addWidget(renderTexBtn)
+        hvlayout.addWidget(self.symbolicBtn)
+        hvlayout.addWidget(workspaceBtn)
+        hvlayout.addWidget(gridBtn)
+        hvlayout.addWidget(self.samplesInput)
+        hvlayout.addWidget(self.meshBtn)
+        playbackLayout = QHBoxLayout()
+        playbackLayout.addWidget(waypointBtn)
+        playbackLayout.addWidget(clearWaypointsBtn)
+        playbackLayout.addWidget(self.cubicBtn)
+        playbackLayout.addWidget(self.playBtn)
+        hvlayout.addLayout(playbackLayout)
+        hvlayout.addWidget(self.targetSettings)
         hvlayout.addWidget(self.dynamicSettings)
         hvlayout.addWidget(self.latex_widget)
         hlayout.addWidget(self.plot3d_widget)
@@ -52,45 +123,226 @@ class Plot3DPage(BaseClassPage):
         self.dynamicSettings.updateUI(self.paramList)
 
     def add_joint(self):
+        alfa, a, tita, d = DH_INTERVALS
         self.paramList.addParameters([
-            NumParam(name=f"alfa{self.joints}", text=f"alfa {self.joints}", default=0, step=1, interval=(-180, 180)),
-            NumParam(name=f"a{self.joints}", text=f"a {self.joints}", default=0, step=1, interval=(0, 100)),
-            NumParam(name=f"tita{self.joints}", text=f"tita {self.joints+1}", default=0, step=1, interval=(-180, 180)),
-            NumParam(name=f"d{self.joints}", text=f"d {self.joints+1}", default=0, step=1, interval=(0, 100)),
+            NumParam(name=f"alfa{self.joints}", text=f"alfa {self.joints}", default=0, step=1, interval=alfa),
+            NumParam(name=f"a{self.joints}", text=f"a {self.joints}", default=0, step=1, interval=a),
+            NumParam(name=f"tita{self.joints}", text=f"tita {self.joints+1}", default=0.0, step=10 ** -TITA_DECIMALS, interval=tita),
+            NumParam(name=f"d{self.joints}", text=f"d {self.joints+1}", default=0, step=1, interval=d),
         ])
         self.joints += 1
 
+    def joint_intervals(self):
+        # (N, 4, 2) ranges of the DH sliders, the sampling and IK bounds
+        params = {p.name: p for p in self.paramList}
+        return np.array([[params[f"{name}{i}"].interval for name in ("alfa", "a", "tita", "d")]
+                         for i in range(self.joints)], dtype=np.float64)
+
+    def joint_params(self):
+        return np.array([[self.paramList[f"{name}{i}"] for name in ("alfa", "a", "tita", "d")]
+                         for i in range(self.joints)], dtype=np.float64).reshape(-1, 4)
+
+    def target(self):
+        return np.array([self.targetList["target_x"], self.targetList["target_y"], self.targetList["target_z"]],
+                        dtype=np.float64)
+
+    def schedule_render(self):
+        # slider drags are coalesced into one render per display frame, with the latest values
+        self.plot3d_widget.schedule(self.render)
+
+    def schedule_target_edit(self):
+        # the IK runs once in the coalesced render, with the latest target
+        self.target_edited = True
+        self.plot3d_widget.schedule(self.render)
+
+    def solve_target(self):
+        if self.targetList["ik"] and self.joints > 0:
+            result = solve_ik(self.joint_params(), self.target(), limits=self.joint_intervals()[:, 2])
+            for i in range(self.joints):
+                # rounded to what the inputs show, so the drawn chain matches the displayed angles
+                self.paramList[f"tita{i}"] = round(float(result.params[i, 2]), TITA_DECIMALS)
+            self.dynamicSettings.refreshValues()
+
+    def add_waypoint(self):
+        params = self.joint_params()
+        if self.waypoints and self.waypoints[0].shape != params.shape:
+            self.waypoints = []
+        self.waypoints.append(params)
+        log.debug("Waypoint %d added", len(self.waypoints))
+
+    def clear_waypoints(self):
+        self.waypoints = []
+
+    def _chain_points(self, f):
+        """
+        Polyline through the origin and the P1, P2 points of every joint at trajectory frame f.
+        """
+        points = np.zeros((2 * self.joints + 1, 3))
+        points[1::2] = self.play_P1[f, :, :3, 3]
+        points[2::2] = self.play_P2[f, :, :3, 3]
+        return points
+
+    def on_play(self, is_on):
+        if not is_on:
+            self.playback_timer.stop()
+            self.render()
+            return
+        if len(self.waypoints) < 2:
+            log.warning("Add at least two waypoints to play a trajectory")
+            self.playBtn.set_value(False)
+            return
+
+        # every frame of the trajectory is computed up front in one batched pass
+        n_frames = PLAYBACK_FPS * SEGMENT_SECONDS * (len(self.waypoints) - 1)
+        method = 'cubic' if self.cubicBtn.value else 'linear'
+        params = interpolate(np.array(self.waypoints), n_frames, method=method)
+        self.play_P1, self.play_P2 = trajectory_frames(params)
+        self.play_frame = 0
+
+        # the GL items are created once and then moved on every tick
+        self.plot3d_widget.begin_frame()
+        self.play_line = self.plot3d_widget.plot_line_strip(self._chain_points(0), color=(1, 1, 1, 0.5), key='trajectory')
+        # path of the end effector, one loop of the trajectory long
+        self.play_trace = self.plot3d_widget.plot_stream(capacity=n_frames, color=(1, 0.8, 0.2, 0.8), key='trace')
+        self.plot3d_widget.append(self.play_trace, self.play_P2[0, -1, :3, 3])
+        self.plot_joint_frames(self.play_P2[0])
+        self.plot3d_widget.show()
+        self.playback_timer.start(int(1000 / PLAYBACK_FPS))
+
+    def on_playback_tick(self):
+        self.play_frame = (self.play_frame + 1) % self.play_P2.shape[0]
+        f = self.play_frame
+        self.plot3d_widget.set_data(self.play_line, pos=self._chain_points(f))
+        self.plot3d_widget.append(self.play_trace, self.play_P2[f, -1, :3, 3])
+        self.plot_joint_frames(self.play_P2[f])
+
+    def sample_workspace(self):
+        """
+        Stream the reachable workspace of the chain into a point cloud, one chunk per timer tick.
+        """
+        self.workspace_timer.stop()
+        if self.workspace_cloud is not None:
+            self.plot3d_widget.remove(self.workspace_cloud)
+
+        n_samples = 10 ** int(self.samplesInput.value())
+        self.workspace_samples = sample_workspace(self.joint_intervals(), n_samples, chunk_size=16384)
+        self.workspace_cloud = self.plot3d_widget.plot_point_cloud(color=(0.3, 0.7, 1.0, 0.3), size=2, permanent=True)
+        self.plot3d_widget.show()
+        self.workspace_timer.start(0)
+
+    def on_workspace_chunk(self):
+        chunk = next(self.workspace_samples, None)
+        if chunk is None:
+            self.workspace_timer.stop()
+            self.workspace_samples = None
+            return
+        self.plot3d_widget.append(self.workspace_cloud, chunk)
+
+    def grid_analysis(self):
+        """
+        Reachability and dexterity over a grid of the joint angles, computed by a process pool.
+        The grid has about as many points as the samples input.
+        """
+        if self.grid_job is not None or self.joints == 0:
+            return
+        steps = max(2, int(round((10 ** int(self.samplesInput.value())) ** (1 / self.joints))))
+        variables, axes = joint_grid(self.joint_intervals(), steps)
+        self.grid_job = GridJob(self.joint_params(), variables, axes)
+        self.grid_timer.start(200)
+
+    def on_grid_poll(self):
+        log.debug("Grid analysis %.0f%%", 100 * self.grid_job.progress())
+        if not self.grid_job.done():
+            return
+        self.grid_timer.stop()
+        try:
+            results = self.grid_job.wait()
+            self.show_point_cloud(results[:, :3], dexterity=results[:, 3])
+        finally:
+            self.grid_job.close()
+            self.grid_job = None
+
+    def show_point_cloud(self, points, dexterity=None):
+        """
+        Replace the workspace cloud with points, colored from blue (low) to red (high) dexterity.
+        """
+        self.workspace_timer.stop()
+        if self.workspace_cloud is not None:
+            self.plot3d_widget.remove(self.workspace_cloud)
+        colors = None
+        if dexterity is not None:
+            w = dexterity / max(float(np.max(dexterity)), 1e-12)
+            colors = np.column_stack((w, 0.3 * np.ones_like(w), 1 - w, 0.3 * np.ones_like(w)))
+        self.workspace_cloud = self.plot3d_widget.plot_point_cloud(points, colors=colors,
+                                                                   color=(0.3, 0.7, 1.0, 0.3), size=2, permanent=True)
+        self.plot3d_widget.show()
+
     def compute(self):
-        chain = JointChain()
+        chain = self.chain
 
         for i in range(self.joints):
             alfa = self.paramList[f"alfa{i}"]
             a = self.paramList[f"a{i}"]
             tita = self.paramList[f"tita{i}"]
             d = self.paramList[f"d{i}"]
-            chain.append(DHParams(alfa, a, tita, d))
+            chain.set_joint(i, DHParams(alfa, a, tita, d))
     
         chain.compute()
 
+        # every link segment goes into one line item and every joint frame into another
+        P = np.empty((len(chain.lines), 3, 4, 4))
         for i, line in enumerate(chain.lines):
-            P0 = np.array(line.P0).astype(np.float64)
-            P1 = np.array(line.P1).astype(np.float64)
-            P2 = np.array(line.P2).astype(np.float64)
-            print(f"Line {i}: P0={P0}, P1={P1}, P2={P2}")
-            self.plot3d_widget.plot_line(P0=P0, P1=P1, alpha=0.5)
-            self.plot3d_widget.plot_line(P0=P1, P1=P2, alpha=0.5)
-
-            self.plot3d_widget.plot_axis(P0=P2, name=f'{i+1}', length=5, permanent=False)
+            P[i, 0] = np.array(line.P0).astype(np.float64)
+            P[i, 1] = np.array(line.P1).astype(np.float64)
+            P[i, 2] = np.array(line.P2).astype(np.float64)
+        starts, ends = P[:, :2, :3, 3].reshape(-1, 3), P[:, 1:, :3, 3].reshape(-1, 3)
+        if len(chain.lines) and self.meshBtn.value:
+            self.plot3d_widget.plot_meshes('cylinder', segment_transforms(starts, ends, radius=LINK_RADIUS),
+                                           color=(0.7, 0.7, 0.75, 1.0), key='link_meshes')
+            # joint boxes around the axis of each joint variable (z after RxDx)
+            self.plot3d_widget.plot_meshes('box', P[:, 1] @ np.diag(JOINT_SIZE), color=(0.9, 0.5, 0.1, 1.0),
+                                           key='joint_meshes')
+        elif len(chain.lines):
+            self.plot3d_widget.plot_vectors(starts, ends, color=(1, 1, 1, 0.5), key='links')
+        self.plot_joint_frames(P[:, 2])
 
         self.expr = chain.end_effector
 
+        if self.targetList["ik"]:
+            target = np.identity(4)
+            target[:3, 3] = self.target()
+            self.plot3d_widget.plot_axis(P0=target, name='t', length=5, key='target')
+
+    def plot_joint_frames(self, frames):
+        """
+        Axes of every joint frame (N, 4, 4), batched into a single line item.
+        """
+        self.plot3d_widget.plot_frames(frames, length=5, names=[str(i + 1) for i in range(frames.shape[0])], key='joints')
+
     def render_latex(self):
-        self.compute()
+        # symbolic end effector of the current chain structure, cached on disk between sessions
+        chain = JointChain(mode='symbolic')
+        for i in range(self.joints):
+            chain.append(DHParams.symbolic(i))
+        chain.simplify()
+        self.expr = chain.end_effector
+        if not self.symbolicBtn.value:
+            params = self.joint_params()
+            values = {symbol: sp.nsimplify(params[i, j])
+                      for i, joint in enumerate(chain.joints) for j, symbol in enumerate(joint.values())}
+            self.expr = self.expr.xreplace(values)
         self.latex_widget.set_expression(self.expr)
         self.latex_widget.show()
 
     def render(self):
-        self.plot3d_widget.clear()
+        if self.playback_timer.isActive():
+            self.playback_timer.stop()
+            self.playBtn.set_value(False)
+        if self.target_edited:
+            self.target_edited = False
+            self.solve_target()
+        # keyed items of the previous render are updated in place, the unused ones are pooled by show()
+        self.plot3d_widget.begin_frame()
         self.compute()
         # mat = self.expr.evalf()
         # self.plot3d_widget.plot_axis(P0=mat, name='1', length=10, permanent=False)
@@ -330,6 +330,16 @@ class NumberInput(QWidget):
 
     def value(self):
         return self.current_value
+
+    def setValue(self, value):
+        """ Set the value without calling on_change """
+        self.current_value = int(value) if self.integer else value
+        self.textbox.blockSignals(True)
+        self.textbox.setText(self.value_to_text(self.current_value))
+        self.textbox.blockSignals(False)
+        self.slider.blockSignals(True)
+        self.slider.setValue(self.value_to_slider_pos(self.current_value))
+        self.slider.blockSignals(False)
     
     def value_to_slider_pos(self, value):
         if self.integer:
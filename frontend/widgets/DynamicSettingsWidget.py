@@ -85,6 +85,7 @@ class DynamicSettingsWidget(QWidget):
             max_widget_width = titleLabel.sizeHint().width() + titleLabel.frameWidth() * 2
         else:
             max_widget_width = 0
+        self.numberInputs = {}
         for param in self.paramList:
             key = param.name
             
@@ -97,6 +98,7 @@ class DynamicSettingsWidget(QWidget):
                 settingWidget = NumberInput(param.text, interval=param.interval, step=param.step, default=param.value, 
                                      on_change= lambda v, k=key: self.on_param_set(k, v), 
                                      sliderRelease=self.sliderRelease)
+                self.numberInputs[key] = settingWidget
             
             elif param.type == "Choice":
                 opt_dict = {}
@@ -134,6 +136,14 @@ class DynamicSettingsWidget(QWidget):
             scroll_width = int(max_widget_width*1.1) + 2*frameWidth + barWidth + margins
             self.scroll_area.setMinimumWidth(scroll_width)
 
+    def refreshValues(self):
+        """
+        Show the current values of the numerical parameters without rebuilding the widgets.
+        Useful when the ParameterList is modified from code.
+        """
+        for key, numberInput in self.numberInputs.items():
+            numberInput.setValue(self.paramList[key])
+
     def on_param_set(self, key, value):
         self.paramList[key] = value
         self.on_edit()
\ No newline at end of file
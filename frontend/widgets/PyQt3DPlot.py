@@ -3,72 +3,806 @@ import numpy as np
 import pyqtgraph as pg
 import pyqtgraph.opengl as gl
 
-from PyQt5.QtWidgets import QVBoxLayout, QWidget, QSizePolicy
-from PyQt5.QtCore import Qt
+from PyQt5.QtWidgets import QApplication, QLabel, QVBoxLayout, QWidget, QSizePolicy
+from PyQt5.QtCore import Qt, QTimer, pyqtSignal
 from PyQt5 import QtGui
 
+import collections
+import functools
+import math
+import time
 import typing as T
 
+# RGBA colors of the x, y and z axes in plot_frames
+AXIS_COLORS = np.array([[1, 0, 0, 1], [0, 1, 0, 1], [0, 0, 1, 1]], dtype=np.float32)
+
+class GLPointCloudItem(gl.GLScatterPlotItem):
+    """
+    Scatter item that grows by appending chunks of points (and optionally per-point RGBA colors).
+    Points are kept in a float32 buffer whose capacity doubles when full, so appending n points
+    in total costs O(n) copies. The item is updated through setData, so the next paint uploads
+    all points again; appends between two paints share that single upload.
+    """
+    def __init__(self, capacity=65536, **kwds):
+        super().__init__(**kwds)
+        self.buffer = np.empty((capacity, 3), dtype=np.float32)
+        self.uniform_color = kwds.get('color', self.color)
+        self.colors = None
+        self.count = 0
+
+    def _grow(self, array, needed):
+        grown = np.empty((max(needed, 2 * array.shape[0]), array.shape[1]), dtype=np.float32)
+        grown[:self.count] = array[:self.count]
+        return grown
+
+    def appendData(self, points, colors=None):
+        points = np.asarray(points, dtype=np.float32)
+        if points.ndim != 2 or points.shape[1] != 3:
+            raise ValueError("points must have shape (N, 3)")
+        needed = self.count + points.shape[0]
+        if needed > self.buffer.shape[0]:
+            self.buffer = self._grow(self.buffer, needed)
+        self.buffer[self.count:needed] = points
+
+        if colors is not None or self.colors is not None:
+            if self.colors is None:
+                self.colors = np.empty((self.buffer.shape[0], 4), dtype=np.float32)
+                self.colors[:self.count] = self.uniform_color
+            elif needed > self.colors.shape[0]:
+                self.colors = self._grow(self.colors, needed)
+            self.colors[self.count:needed] = self.uniform_color if colors is None else colors
+
+        self.count = needed
+        if self.colors is not None:
+            self.setData(pos=self.buffer[:self.count], color=self.colors[:self.count])
+        else:
+            self.setData(pos=self.buffer[:self.count])
+
+    def clearData(self):
+        self.count = 0
+        self.setData(pos=self.buffer[:0])
+
+def pixels_per_unit(view: gl.GLViewWidget, distance: float) -> float:
+    """
+    On-screen pixels per scene unit at the given distance from the camera of view.
+    """
+    return view.deviceHeight() / (2 * distance * math.tan(math.radians(view.opts['fov']) / 2))
+
+def lod_levels(points: np.ndarray, min_points: int = 1024, stride: int = 8) -> T.List[np.ndarray]:
+    """
+    Multi-resolution pyramid of a polyline (N, 3), as index arrays into points.
+    Level 0 holds every point and each next level about half of the previous one, down to min_points.
+    A level keeps the end points, every stride-th point of the previous level (so one level never opens
+    a gap of more than stride segments) and then the points that deviate most from the chord between
+    their neighbours. Curved regions keep their detail while straight runs collapse to a few points.
+    """
+    index = np.arange(points.shape[0], dtype=np.int64)
+    levels = [index]
+    while index.shape[0] > 2 * min_points:
+        p = points[index]
+        a, b, c = p[:-2], p[1:-1], p[2:]
+        chord = c - a
+        deviation = np.linalg.norm(np.cross(b - a, chord), axis=1) / np.maximum(np.linalg.norm(chord, axis=1), 1e-12)
+
+        keep = np.zeros(index.shape[0], dtype=bool)
+        keep[::stride] = True
+        keep[[0, -1]] = True
+        remaining = index.shape[0] // 2 - int(keep.sum())
+        if remaining > 0:
+            deviation[keep[1:-1]] = -1
+            keep[1 + np.argpartition(deviation, -remaining)[-remaining:]] = True
+        index = index[keep]
+        levels.append(index)
+    return levels
+
+class GLLODLinePlotItem(gl.GLLinePlotItem):
+    """
+    Line strip drawn from a level-of-detail pyramid of its points (see lod_levels).
+    updateLevel() picks the coarsest level that still gives about pixels_per_segment screen pixels
+    per segment, from the camera distance, field of view and viewport height, and sets its vertices
+    when it changed. PyQt3DPlot calls it whenever the camera moves.
+    """
+    def __init__(self, min_points=1024, pixels_per_segment=2.0, **kwds):
+        super().__init__()
+        self.min_points = min_points
+        self.pixels_per_segment = pixels_per_segment
+        self.points = None
+        self.colors = None
+        self.levels = []
+        self.level = None
+        kwds['mode'] = 'line_strip'
+        self.setData(**kwds)
+
+    def setData(self, **kwds):
+        if 'pos' in kwds:
+            points = np.ascontiguousarray(kwds.pop('pos'), dtype=np.float32)
+            self.points = points
+            self.levels = lod_levels(points, self.min_points)
+            lo, hi = points.min(axis=0), points.max(axis=0)
+            self.center = pg.Vector(*((lo + hi) / 2))
+            self.radius = float(np.linalg.norm(hi - lo)) / 2
+            self.arc_length = float(np.linalg.norm(np.diff(points, axis=0), axis=1).sum())
+            self.level = self.select_level()
+            kwds['pos'] = points[self.levels[self.level]]
+        if 'color' in kwds:
+            color = kwds['color']
+            self.colors = np.ascontiguousarray(color, dtype=np.float32) if isinstance(color, np.ndarray) else None
+            if self.colors is not None and self.levels:
+                kwds['color'] = self.colors[self.levels[self.level]]
+        super().setData(**kwds)
+
+    def select_level(self) -> int:
+        view = self.view()
+        if view is None or not self.levels:
+            return 0
+        distance = (view.cameraPosition() - self.mapToView(self.center)).length() - self.radius
+        if distance <= 0:
+            return 0
+        target = self.arc_length * pixels_per_unit(view, distance) / self.pixels_per_segment
+        for level in range(len(self.levels) - 1, 0, -1):
+            if self.levels[level].shape[0] >= target:
+                return level
+        return 0
+
+    def updateLevel(self) -> bool:
+        """
+        Switch to the level that fits the current camera. Returns True when the vertices changed.
+        """
+        level = self.select_level()
+        if level == self.level or self.points is None:
+            return False
+        self.level = level
+        index = self.levels[level]
+        kwds = dict(pos=self.points[index])
+        if self.colors is not None:
+            kwds['color'] = self.colors[index]
+        super().setData(**kwds)
+        return True
+
+class GLStreamLineItem(gl.GLLinePlotItem):
+    """
+    Polyline of the last capacity samples, for live data. Samples are stored as line segments
+    (previous sample, new sample) in a fixed ring buffer, drawn in 'lines' mode so the ring needs
+    no reordering: a new sample overwrites the oldest segment in place. The ring is handed to
+    setData as a view, so the next paint uploads the valid segments without copying them first.
+    """
+    def __init__(self, capacity=4096, **kwds):
+        super().__init__()
+        self.setCapacity(capacity)
+        kwds['mode'] = 'lines'
+        self.setData(**kwds)
+
+    def setCapacity(self, capacity):
+        self.capacity = int(capacity)
+        self.segments = np.zeros((self.capacity, 2, 3), dtype=np.float32)
+        self.clearData()
+
+    def clearData(self):
+        self.head = 0           # slot the next segment is written to
+        self.count = 0          # valid segments, the first count slots until the ring is full
+        self.last = None        # latest sample, start of the next segment
+        self.setData(pos=self.segments.reshape(-1, 3)[:0])
+
+    def appendData(self, points):
+        points = np.asarray(points, dtype=np.float32).reshape(-1, 3)
+        if points.shape[0] == 0:
+            return
+        if self.last is None:
+            self.last = points[0].copy()
+            points = points[1:]
+        if points.shape[0] > self.capacity:
+            self.last = points[-self.capacity - 1].copy()
+            points = points[-self.capacity:]
+        k = points.shape[0]
+        if k == 0:
+            return
+
+        starts = np.concatenate([self.last[None], points[:-1]])
+        slots = (self.head + np.arange(k)) % self.capacity
+        self.segments[slots, 0] = starts
+        self.segments[slots, 1] = points
+
+        self.head = (self.head + k) % self.capacity
+        self.count = min(self.count + k, self.capacity)
+        self.last = points[-1].copy()
+        self.setData(pos=self.segments.reshape(-1, 3)[:2 * self.count])
+
+def _orthonormal_frames(u: np.ndarray) -> T.Tuple[np.ndarray, np.ndarray]:
+    """
+    Unit vectors v, w (N, 3) completing each unit vector u (N, 3) to a right-handed frame (v, w, u).
+    """
+    helper = np.where(np.abs(u[:, :1]) < 0.9, [[1, 0, 0]], [[0, 1, 0]]).astype(u.dtype)
+    v = np.cross(u, helper)
+    v /= np.maximum(np.linalg.norm(v, axis=1, keepdims=True), 1e-12)
+    return v, np.cross(u, v)
+
+@functools.lru_cache(maxsize=None)
+def unit_mesh(kind: str) -> T.Tuple[np.ndarray, np.ndarray]:
+    """
+    Shared unit geometry (vertexes (V, 3), faces (F, 3)) of the mesh primitives:
+    - 'cylinder': radius 1 around the z axis, from z = 0 to z = 1, open ends
+    - 'box':      the cube [-0.5, 0.5]^3
+    """
+    if kind == 'cylinder':
+        mesh = gl.MeshData.cylinder(rows=1, cols=16, radius=[1.0, 1.0], length=1.0)
+        return mesh.vertexes().astype(np.float32), mesh.faces()
+    if kind == 'box':
+        # vertex index = 4 x + 2 y + z, faces wound outwards
+        vertexes = np.array([[x, y, z] for x in (-0.5, 0.5) for y in (-0.5, 0.5) for z in (-0.5, 0.5)], dtype=np.float32)
+        faces = np.array([[0, 1, 3], [0, 3, 2], [4, 6, 7], [4, 7, 5],
+                          [0, 4, 5], [0, 5, 1], [2, 3, 7], [2, 7, 6],
+                          [0, 2, 6], [0, 6, 4], [1, 5, 7], [1, 7, 3]])
+        return vertexes, faces
+    raise ValueError(f"Unknown mesh primitive '{kind}'")
+
+@functools.lru_cache(maxsize=64)
+def _instance_faces(kind: str, n: int) -> np.ndarray:
+    vertexes, faces = unit_mesh(kind)
+    return (faces[None] + vertexes.shape[0] * np.arange(n)[:, None, None]).reshape(-1, 3)
+
+@functools.lru_cache(maxsize=None)
+def _unit_normals(kind: str) -> np.ndarray:
+    vertexes, faces = unit_mesh(kind)
+    return gl.MeshData(vertexes=vertexes, faces=faces).vertexNormals().astype(np.float32)
+
+def segment_transforms(starts, ends, radius=1.0, eps=1e-9) -> np.ndarray:
+    """
+    Transforms (M, 4, 4) that map the unit cylinder onto cylinders of the given radius from starts[i] to ends[i].
+    Segments shorter than eps (e.g. zero-length links) are left out, so M can be smaller than len(starts).
+    """
+    starts = np.asarray(starts, dtype=np.float64)
+    d = np.asarray(ends, dtype=np.float64) - starts
+    length = np.linalg.norm(d, axis=1, keepdims=True)
+    keep = length[:, 0] >= eps
+    starts, d = starts[keep], d[keep]
+    u = d / length[keep]
+    v, w = _orthonormal_frames(u)
+    out = np.zeros((starts.shape[0], 4, 4))
+    out[:, :3, 0] = radius * v
+    out[:, :3, 1] = radius * w
+    out[:, :3, 2] = d
+    out[:, :3, 3] = starts
+    out[:, 3, 3] = 1
+    return out
+
+class InstancedMeshData(gl.MeshData):
+    """
+    MeshData of n copies of a unit_mesh primitive. The faces are fixed, place() moves the copies,
+    and the vertex normals are the unit mesh normals carried along by the transforms instead of
+    being recomputed from the faces.
+    """
+    def __init__(self, kind, n):
+        vertexes, faces = unit_mesh(kind)
+        super().__init__(vertexes=np.zeros((n * vertexes.shape[0], 3), dtype=np.float32),
+                         faces=_instance_faces(kind, n))
+        self.kind = kind
+        self.n = n
+        self.normals = np.zeros((n * vertexes.shape[0], 3), dtype=np.float32)
+
+    def place(self, transforms):
+        """
+        transforms has shape (n, 4, 4).
+        """
+        vertexes, _ = unit_mesh(self.kind)
+        linear = transforms[:, :3, :3]
+        self.setVertexes((vertexes @ np.swapaxes(linear, 1, 2) + transforms[:, None, :3, 3]).reshape(-1, 3))
+        # normals transform with the inverse transpose of the linear part
+        normals = (_unit_normals(self.kind) @ np.linalg.inv(linear)).reshape(-1, 3)
+        self.normals = normals / np.maximum(np.linalg.norm(normals, axis=1, keepdims=True), 1e-12)
+
+    def vertexNormals(self, indexed=None):
+        if indexed == 'faces':
+            return self.normals[self.faces()]
+        return self.normals
+
+class GLMeshInstancesItem(gl.GLMeshItem):
+    """
+    Many copies of one unit mesh primitive (see unit_mesh) drawn as a single mesh item.
+    Each copy is placed by its own transform on the CPU. The MeshData is kept while the primitive,
+    the number of copies and the color mode stay the same, so an update only moves its vertices.
+    """
+    def __init__(self, **kwds):
+        kwds.setdefault('shader', 'shaded')
+        super().__init__(**kwds)
+        self.mesh = None        # InstancedMeshData of the last setInstances
+
+    def setInstances(self, kind, transforms, color=(0.7, 0.7, 0.7, 1.0)):
+        """
+        kind is a unit_mesh primitive, transforms has shape (N, 4, 4).
+        color is one RGBA tuple or an (N, 4) array of per-instance colors.
+        """
+        transforms = np.asarray(transforms, dtype=np.float32)
+        N = transforms.shape[0]
+        per_instance = np.ndim(color) == 2
+        mesh = self.mesh
+        if mesh is None or (mesh.kind, mesh.n, mesh.hasVertexColor()) != (kind, N, per_instance):
+            mesh = InstancedMeshData(kind, N)
+        mesh.place(transforms)
+        if per_instance:
+            mesh.setVertexColors(np.repeat(np.asarray(color, dtype=np.float32), unit_mesh(kind)[0].shape[0], axis=0))
+        else:
+            self.setColor(color)
+        if mesh is self.mesh:
+            self.meshDataChanged()
+        else:
+            self.mesh = mesh
+            self.setMeshData(meshdata=mesh, smooth=kind == 'cylinder')
+
+class GLArrowItem(gl.GLLinePlotItem):
+    """
+    N arrows drawn as one 'lines' item: per arrow a shaft plus a head of HEAD_BARBS barbs.
+    The head is one shared template in the arrow's local frame (z along the arrow), rotated
+    and scaled onto every arrow on the CPU in one vectorized step, with per-arrow colors.
+    """
+    HEAD_BARBS = 4
+    VERTICES = 2 + 2 * HEAD_BARBS
+
+    def __init__(self, **kwds):
+        super().__init__()
+        angles = np.linspace(0, 2 * np.pi, self.HEAD_BARBS, endpoint=False)
+        # barb ends as (axial, radial_v, radial_w) multiples of the head length behind the tip
+        self.template = np.column_stack((-np.ones_like(angles), np.cos(angles), np.sin(angles)))
+        self.buffer = np.empty((0, self.VERTICES, 3), dtype=np.float32)
+        kwds['mode'] = 'lines'
+        self.setData(**kwds)
+
+    def setArrows(self, starts, ends, color=(1, 1, 1, 1), head_size=0.25, head_width=0.4, **kwds):
+        """
+        starts and ends have shape (N, 3). color is one RGBA tuple or (N, 4) per-arrow colors.
+        The head is head_size times the arrow length long and head_width times its length wide.
+        """
+        starts = np.asarray(starts, dtype=np.float32)
+        ends = np.asarray(ends, dtype=np.float32)
+        N = starts.shape[0]
+        if self.buffer.shape[0] != N:
+            self.buffer = np.empty((N, self.VERTICES, 3), dtype=np.float32)
+
+        d = ends - starts
+        length = np.linalg.norm(d, axis=1, keepdims=True)
+        u = d / np.maximum(length, 1e-12)
+        v, w = _orthonormal_frames(u)
+
+        head = head_size * length
+        basis = np.stack((u * head, v * head * head_width, w * head * head_width), axis=1)   # (N, 3, 3)
+        self.buffer[:, 0] = starts
+        self.buffer[:, 1] = ends
+        self.buffer[:, 2::2] = ends[:, None]
+        self.buffer[:, 3::2] = ends[:, None] + self.template @ basis
+
+        if np.ndim(color) == 2:
+            color = np.repeat(np.asarray(color, dtype=np.float32), self.VERTICES, axis=0)
+        self.setData(pos=self.buffer.reshape(-1, 3), color=color, **kwds)
+
+class PlotStats:
+    """
+    Draw statistics of a PyQt3DPlot, one record per painted frame (see PyQt3DPlot.enable_stats).
+    Times are in milliseconds and cover the work since the previous frame:
+    - fps:        painted frames during the last second
+    - frame_time: duration of the GL paint, buffer uploads included
+    - latency:    from the first repaint request to the start of the paint (Qt event handling)
+    - set_data:   time spent updating item data through the plot (plot_* methods, set_data and append)
+    - add_item:   time spent attaching new items to the view
+    - vertices:   vertices handed to the GL items since the previous frame: for level-of-detail
+                  lines the level they draw, including level switches on camera moves
+    - items:      GL items in the view
+    """
+    FIELDS = ('fps', 'frame_time', 'latency', 'set_data', 'add_item', 'vertices', 'items')
+
+    def __init__(self, history=600, callback: T.Optional[T.Callable[[dict], None]] = None):
+        self.frames = collections.deque(maxlen=history)
+        self.callback = callback
+        self.paints = collections.deque()   # start times of the paints of the last second
+        self.requested = None               # time of the first repaint request since the last paint
+        self.set_data = 0.0
+        self.add_item = 0.0
+        self.vertices = 0
+
+    def last(self) -> dict:
+        return self.frames[-1] if self.frames else {}
+
+    def frame(self, start, end, items):
+        self.paints.append(start)
+        while self.paints[0] < start - 1.0:
+            self.paints.popleft()
+        record = dict(fps=len(self.paints),
+                      frame_time=1e3 * (end - start),
+                      latency=1e3 * (start - self.requested) if self.requested is not None else 0.0,
+                      set_data=self.set_data,
+                      add_item=self.add_item,
+                      vertices=self.vertices,
+                      items=items)
+        self.frames.append(record)
+        self.requested = None
+        self.set_data = 0.0
+        self.add_item = 0.0
+        self.vertices = 0
+        if self.callback is not None:
+            self.callback(record)
+
+class GLPlotViewWidget(gl.GLViewWidget):
+    """
+    GLViewWidget that reports each paint to a PlotStats when stats is set, removes items in bulk,
+    and emits cameraChanged when a paint finds the camera or the viewport changed.
+    """
+    cameraChanged = pyqtSignal()
+    stats: T.Optional[PlotStats] = None
+    camera = None
+
+    def removeItems(self, items):
+        """
+        Remove many items from the scene with one pass over the item list, the bulk version of removeItem().
+        """
+        items = set(items)
+        self.items = [item for item in self.items if item not in items]
+        for item in items:
+            item._setView(None)
+        self.update()
+
+    def update(self):
+        if self.stats is not None and self.stats.requested is None:
+            self.stats.requested = time.perf_counter()
+        super().update()
+
+    def paintGL(self):
+        position = self.cameraPosition()
+        camera = (position.x(), position.y(), position.z(), self.opts['fov'], self.deviceWidth(), self.deviceHeight())
+        if camera != self.camera:
+            self.camera = camera
+            self.cameraChanged.emit()
+        if self.stats is None:
+            return super().paintGL()
+        start = time.perf_counter()
+        super().paintGL()
+        self.stats.frame(start, time.perf_counter(), len(self.items))
+
 class PyQt3DPlot(QWidget):
+    """
+    3D plot widget. Items are either transient (removed by clear()), permanent, or keyed.
+
+    Keyed items (key=... in the plot_* methods) are retained between frames: plotting the same key
+    again updates the existing item in place with setData instead of allocating a new one.
+    A frame starts with begin_frame(); keys not plotted again before show() are hidden and
+    their items go back to a pool, from which new keys take items before creating any.
+    """
     def __init__(self, parent=None):
         super(PyQt3DPlot, self).__init__(parent)
 
         # Create a GL View widget
-        self.w = gl.GLViewWidget()
+        self.w = GLPlotViewWidget()
         self.w.setSizePolicy(pg.QtWidgets.QSizePolicy.Expanding, pg.QtWidgets.QSizePolicy.Expanding)
         self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
         self.w.setWindowTitle('3D Plot')
         self.w.setCameraPosition(distance=200, azimuth=-90)
 
-        self.permanent_items = []
-        self.items = []
+        # ordered sets (dict keys) of the items owned by the plot, by lifetime
+        self.permanent_items = {}
+        self.items = {}
+        self.in_view = set()    # items attached to the GL view
+        self.pending = {}       # items created since the last show(), attached by it
+
+        self.keyed = {}         # key -> item shown in the current frame
+        self.item_keys = {}     # item -> its key, the inverse of keyed
+        self.used = set()       # keys plotted since begin_frame()
+        self.pool = {}          # item class -> hidden items ready for reuse
+
+        self.stats = None       # PlotStats while enable_stats() is on
+        self.overlay = None
+
+        # redraws requested with schedule(), run together at most once per display interval
+        self.scheduled = {}
+        self.last_flush = 0.0
+        self.render_timer = QTimer(self)
+        self.render_timer.setSingleShot(True)
+        self.render_timer.timeout.connect(self.flush)
+
+        # level-of-detail items follow the camera, the signal comes before the paint that uses it
+        self.w.cameraChanged.connect(self._update_lod)
 
         self.layout = QVBoxLayout()
         self.layout.addWidget(self.w)
         self.setLayout(self.layout)
 
+    def _attach(self, items):
+        """
+        Add the items that are not in the GL view yet. addItem() only requests a repaint,
+        Qt merges the requests into the single paint of the next event loop pass.
+        """
+        for item in items:
+            if item not in self.in_view:
+                self.w.addItem(item)
+                self.in_view.add(item)
+                if isinstance(item, GLLODLinePlotItem):
+                    # the level set before the item had a view ignored the camera
+                    self._update_level(item, force=True)
+
+    def _detach(self, items):
+        """
+        Remove the items that are in the GL view, see GLPlotViewWidget.removeItems.
+        """
+        items = {item for item in items if item in self.in_view}
+        if items:
+            self.w.removeItems(items)
+            self.in_view -= items
+
+    def _update_lod(self):
+        for item in self.in_view:
+            if isinstance(item, GLLODLinePlotItem) and item.visible():
+                self._update_level(item)
+
+    def _update_level(self, item, force=False):
+        """
+        item.updateLevel(), counting the vertices of the new level when it changed, or always with force.
+        """
+        changed = self._update(item.updateLevel)
+        if (changed or force) and self.stats is not None and item.levels:
+            self.stats.vertices += item.levels[item.level].shape[0]
+
+    def _track(self, item, permanent=False):
+        if permanent:
+            self.permanent_items[item] = None
+        else:
+            self.items[item] = None
+        self.pending[item] = None
+        return item
+
+    def screen_length(self, start, end) -> float:
+        """
+        Upper bound of the on-screen length in pixels of the segment from start to end, with the current camera.
+        The whole segment is taken at the distance of its point closest to the camera.
+        """
+        start = np.asarray(start, dtype=np.float64)
+        d = np.asarray(end, dtype=np.float64) - start
+        length = float(np.linalg.norm(d))
+        position = self.w.cameraPosition()
+        camera = np.array([position.x(), position.y(), position.z()])
+        u = np.clip(np.dot(camera - start, d) / length ** 2, 0, 1) if length > 0 else 0.0
+        distance = float(np.linalg.norm(start + u * d - camera))
+        if distance <= 0:
+            return math.inf
+        return length * pixels_per_unit(self.w, distance)
+
+    def frame_interval(self) -> float:
+        """
+        Display refresh interval in milliseconds.
+        """
+        screen = self.screen() or QApplication.primaryScreen()
+        rate = screen.refreshRate() if screen is not None else 0
+        return 1000.0 / rate if rate > 0 else 16.0
+
+    def schedule(self, callback: T.Callable[[], None]):
+        """
+        Run callback (e.g. the page's redraw) at the next display interval instead of now.
+        Requests that arrive before it runs are merged: every distinct callback runs once, reading
+        the latest parameters, so a burst of slider events costs a single redraw.
+        """
+        self.scheduled[callback] = None
+        if not self.render_timer.isActive():
+            elapsed = 1e3 * (time.perf_counter() - self.last_flush)
+            self.render_timer.start(int(max(0.0, self.frame_interval() - elapsed)))
+
+    def flush(self):
+        """
+        Run the scheduled callbacks now.
+        """
+        self.render_timer.stop()
+        callbacks, self.scheduled = self.scheduled, {}
+        self.last_flush = time.perf_counter()
+        for callback in callbacks:
+            callback()
+
+    def enable_stats(self, overlay=True, callback: T.Optional[T.Callable[[dict], None]] = None) -> PlotStats:
+        """
+        Record draw statistics of every painted frame (see PlotStats), optionally shown as an overlay
+        in the corner of the view. callback is called with each frame record, e.g. for logging.
+        """
+        if self.stats is None:
+            self.stats = PlotStats(callback=callback)
+            self.w.stats = self.stats
+        self.stats.callback = callback
+        if overlay and self.overlay is None:
+            self.overlay = QLabel(self.w)
+            self.overlay.setStyleSheet("color: white; background: rgba(0, 0, 0, 120); font-family: monospace; padding: 4px;")
+            self.overlay.move(8, 8)
+            self.overlay.show()
+            # refreshed by a timer rather than from paintGL, the label is drawn over the view
+            self.overlay_timer = QTimer(self)
+            self.overlay_timer.timeout.connect(self._update_overlay)
+            self.overlay_timer.start(250)
+        return self.stats
+
+    def disable_stats(self):
+        if self.overlay is not None:
+            self.overlay_timer.stop()
+            self.overlay.deleteLater()
+            self.overlay = None
+        self.stats = None
+        self.w.stats = None
+
+    def frame_stats(self) -> dict:
+        """
+        Statistics of the last painted frame, empty when stats are off or nothing was painted yet.
+        """
+        return self.stats.last() if self.stats is not None else {}
+
+    def _update(self, method, *args, vertices=0, **kwds):
+        """
+        Call a data method of an item (setData, setArrows, ...). With stats on, its time and the
+        number of vertices it receives are added to the current frame.
+        """
+        if self.stats is None:
+            return method(*args, **kwds)
+        start = time.perf_counter()
+        try:
+            return method(*args, **kwds)
+        finally:
+            self.stats.set_data += 1e3 * (time.perf_counter() - start)
+            self.stats.vertices += vertices
+
+    def set_data(self, item, **kwds):
+        """
+        item.setData(**kwds), counted in the draw statistics. Use it to update returned items in place.
+        """
+        pos = kwds.get('pos')
+        if isinstance(item, GLLODLinePlotItem):
+            # the item keeps the full strip and only hands the selected level to GL;
+            # before it is attached nothing is drawn, _attach counts the level it starts with
+            result = self._update(item.setData, **kwds)
+            if pos is not None and self.stats is not None and item.view() is not None:
+                self.stats.vertices += item.levels[item.level].shape[0]
+            return result
+        vertices = 0 if pos is None else np.asarray(pos).reshape(-1, 3).shape[0]
+        return self._update(item.setData, vertices=vertices, **kwds)
+
+    def append(self, item, points, colors=None):
+        """
+        Append points to a GLStreamLineItem or GLPointCloudItem, counted in the draw statistics.
+        """
+        points = np.asarray(points).reshape(-1, 3)
+        vertices = points.shape[0] * (2 if isinstance(item, GLStreamLineItem) else 1)
+        if colors is None:
+            return self._update(item.appendData, points, vertices=vertices)
+        return self._update(item.appendData, points, colors, vertices=vertices)
+
+    def _update_overlay(self):
+        record = self.frame_stats()
+        if not record:
+            return
+        self.overlay.setText(f"{record['fps']:3d} fps  frame {record['frame_time']:6.2f} ms  latency {record['latency']:6.2f} ms\n"
+                             f"setData {record['set_data']:6.2f} ms  addItem {record['add_item']:6.2f} ms\n"
+                             f"{record['items']} items  {record['vertices']} vertices uploaded")
+        self.overlay.adjustSize()
+
     def clear(self):
+        self._detach(self.items)
         for item in self.items:
-            if item in self.w.items:
-                self.w.removeItem(item)
-        self.items = []
+            self.pending.pop(item, None)
+        self.items = {}
+        for key in list(self.keyed):
+            self._release(key)
+        self.used = set()
+        self.w.update()
+
+    def remove(self, item):
+        """
+        Remove a single item (transient, permanent or keyed) from the plot.
+        """
+        self._detach([item])
+        self.items.pop(item, None)
+        self.permanent_items.pop(item, None)
+        self.pending.pop(item, None)
+        key = self.item_keys.pop(item, None)
+        if key is not None:
+            del self.keyed[key]
+            self.used.discard(key)
+        self.w.update()
+
+    def begin_frame(self):
+        """
+        Start a new frame of keyed items, see the class docstring.
+        """
+        self.used = set()
+
+    def _release(self, key):
+        item = self.keyed.pop(key)
+        del self.item_keys[item]
+        item.setVisible(False)
+        self.pool.setdefault(type(item), []).append(item)
+
+    def _retained(self, key, cls):
+        """
+        Item stored under key. The first time a key is plotted (or when it held another kind of item)
+        an item is taken from the pool, or created and attached to the view by the next show().
+        """
+        item = self.keyed.get(key)
+        if item is not None and type(item) is not cls:
+            self._release(key)
+            item = None
+        if item is None:
+            free = self.pool.get(cls)
+            if free:
+                item = free.pop()
+                item.resetTransform()
+                item.setVisible(True)
+            else:
+                item = cls()
+                self.pending[item] = None
+            self.keyed[key] = item
+            self.item_keys[item] = key
+        self.used.add(key)
+        return item
+
+    def _item(self, cls, key=None, permanent=False):
+        if key is not None:
+            return self._retained(key, cls)
+        return self._track(cls(), permanent)
+
+    def set_transform(self, items, P0=np.identity(4)):
+        """
+        Move already plotted items (e.g. the ones returned by plot_axis) to the transformation matrix P0.
+        """
+        m = pg.Transform3D(P0)
+        for item in items:
+            item.setTransform(m)
 
     def add_grid(self, size=10):
-        grid = gl.GLGridItem()
+        grid = self._item(gl.GLGridItem, permanent=True)
         grid.scale(size, size, 1)
-        self.permanent_items.append(grid)
 
     def show(self):
-        for item in self.items:
-            self.w.addItem(item)
-        for item in self.permanent_items:
-            if item not in self.w.items:
-                self.w.addItem(item)
+        """
+        Finish the frame: pool the unused keyed items, attach the new items and repaint once.
+        Items already in the view are not touched again, their setData calls mark them for redraw.
+        """
+        for key in [key for key in self.keyed if key not in self.used]:
+            self._release(key)
+        start = time.perf_counter()
+        self._attach(self.pending)
+        if self.stats is not None:
+            self.stats.add_item += 1e3 * (time.perf_counter() - start)
+        self.pending = {}
+        self._update_lod()
+        self.w.update()
         self.w.show()
 
+    def render_image(self, size=None) -> QtGui.QImage:
+        """
+        Render the scene into a QImage, optionally resizing the view to size (width, height) first.
+        The view needs a GL context, so a widget that was never shown is shown first; on the
+        offscreen platform (see frontend/Export.py) that opens no window, but still needs a display.
+        """
+        if size is not None:
+            self.w.resize(*size)
+        if not self.w.isValid():
+            self.window().show()
+            QApplication.processEvents()
+        image = self.w.readQImage()
+        if image.isNull():
+            raise RuntimeError("The 3D view has no OpenGL context. Headless rendering needs a software GL "
+                               "(e.g. Mesa llvmpipe) and, on Linux, an X display such as xvfb-run")
+        return image
+
     def plot_line(self, P0=np.identity(4), P1=np.identity(4), 
                   color=(1, 1, 1, 1), 
                   width=2, 
                   permanent=False,
                   mode: T.Literal['lines', 'line_strip'] = 'lines',
-                  alpha=None):
+                  alpha=None,
+                  key=None):
         """
         Plot a line between two transformation matrices P0 and P1.
         """
-        line = gl.GLLinePlotItem()
+        line = self._item(gl.GLLinePlotItem, key, permanent)
         color = (color[0], color[1], color[2], alpha if alpha is not None else color[3])
-        line.setData(pos=np.array([[P0[0, 3], P0[1, 3], P0[2, 3]],
-                                   [P1[0, 3], P1[1, 3], P1[2, 3]]]),
-                     color=color, width=width, antialias=True, mode=mode)
-        if permanent:
-            self.permanent_items.append(line)
-        else:
-            self.items.append(line)
+        self.set_data(line, pos=np.array([[P0[0, 3], P0[1, 3], P0[2, 3]],
+                                          [P1[0, 3], P1[1, 3], P1[2, 3]]]),
+                      color=color, width=width, antialias=True, mode=mode)
+        return line
 
-    def plot_vectors(self, starts, ends, color=(1, 1, 1, 0.9), width=2, permanent=False):
+    def plot_vectors(self, starts, ends, color=(1, 1, 1, 0.9), width=2, permanent=False, key=None):
         """
         Plot many independent line segments from starts[i] to ends[i] in one GL item.
         starts and ends must be arrays with shape (N, 3).
+        color is one RGBA tuple or an (N, 4) array of per-segment colors.
         """
         starts = np.asarray(starts, dtype=np.float64)
         ends = np.asarray(ends, dtype=np.float64)
@@ -81,17 +815,46 @@ class PyQt3DPlot(QWidget):
         pos = np.empty((starts.shape[0] * 2, 3), dtype=np.float64)
         pos[0::2] = starts
         pos[1::2] = ends
+        if np.ndim(color) == 2:
+            color = np.repeat(np.asarray(color, dtype=np.float32), 2, axis=0)
 
-        line = gl.GLLinePlotItem()
-        line.setData(pos=pos, color=color, width=width, antialias=True, mode='lines')
-        if permanent:
-            self.permanent_items.append(line)
-        else:
-            self.items.append(line)
+        line = self._item(gl.GLLinePlotItem, key, permanent)
+        self.set_data(line, pos=pos, color=color, width=width, antialias=True, mode='lines')
+        return line
+
+    def plot_arrows(self, starts, ends, color=(1, 1, 1, 0.9), width=2, head_size=0.25, head_width=0.4,
+                    permanent=False, key=None) -> GLArrowItem:
+        """
+        Plot N arrows from starts[i] to ends[i] (shape (N, 3)) with one GLArrowItem, a single draw call.
+        color is one RGBA tuple or an (N, 4) array of per-arrow colors.
+        """
+        starts = np.asarray(starts, dtype=np.float64)
+        ends = np.asarray(ends, dtype=np.float64)
+        if starts.shape != ends.shape or starts.ndim != 2 or starts.shape[1] != 3:
+            raise ValueError("starts and ends must have shape (N, 3)")
+        arrows = self._item(GLArrowItem, key, permanent)
+        self._update(arrows.setArrows, starts, ends, color=color, head_size=head_size, head_width=head_width,
+                     width=width, antialias=True, vertices=starts.shape[0] * GLArrowItem.VERTICES)
+        return arrows
 
-    def plot_line_strip(self, points, color=(1, 1, 1, 0.9), width=2, permanent=False):
+    def plot_meshes(self, kind, transforms, color=(0.7, 0.7, 0.7, 1.0), permanent=False, key=None) -> GLMeshInstancesItem:
+        """
+        Plot one copy of the unit mesh primitive kind ('cylinder' or 'box', see unit_mesh)
+        per transformation matrix of transforms (N, 4, 4), all in one mesh item.
+        """
+        transforms = np.asarray(transforms, dtype=np.float64)
+        if transforms.ndim != 3 or transforms.shape[1:] != (4, 4):
+            raise ValueError("transforms must have shape (N, 4, 4)")
+        meshes = self._item(GLMeshInstancesItem, key, permanent)
+        self._update(meshes.setInstances, kind, transforms, color=color,
+                     vertices=transforms.shape[0] * unit_mesh(kind)[0].shape[0])
+        return meshes
+
+    def plot_line_strip(self, points, color=(1, 1, 1, 0.9), width=2, permanent=False, key=None, lod=False):
         """
         Plot a continuous 3D polyline from an array of points with shape (N, 3).
+        With lod=True the strip is drawn through a GLLODLinePlotItem, whose vertex count follows
+        its size on screen; use it for strips of millions of points.
         """
         points = np.asarray(points, dtype=np.float64)
         if points.ndim != 2 or points.shape[1] != 3:
@@ -99,41 +862,91 @@ class PyQt3DPlot(QWidget):
         if points.shape[0] < 2:
             return
 
-        line = gl.GLLinePlotItem()
-        line.setData(pos=points, color=color, width=width, antialias=True, mode='line_strip')
-        if permanent:
-            self.permanent_items.append(line)
+        if lod:
+            line = self._item(GLLODLinePlotItem, key, permanent)
+            self.set_data(line, pos=points, color=color, width=width, antialias=True)
         else:
-            self.items.append(line)
+            line = self._item(gl.GLLinePlotItem, key, permanent)
+            self.set_data(line, pos=points, color=color, width=width, antialias=True, mode='line_strip')
+        return line
+
+    def plot_stream(self, capacity=4096, color=(1, 1, 1, 0.9), width=2, permanent=False, key=None) -> GLStreamLineItem:
+        """
+        Create a streaming polyline of at most capacity samples. New samples are added with append().
+        A key already in use returns its stream unchanged (apart from color and width), so it keeps its history.
+        """
+        fresh = key is None or key not in self.keyed
+        stream = self._item(GLStreamLineItem, key, permanent)
+        if stream.capacity != capacity:
+            stream.setCapacity(capacity)
+        elif fresh:
+            stream.clearData()
+        self.set_data(stream, color=color, width=width, antialias=True)
+        return stream
+
+    def plot_point_cloud(self, points=None, colors=None, color=(1, 1, 1, 0.5), size=2, permanent=False) -> GLPointCloudItem:
+        """
+        Create a growing point cloud item. More points can be streamed into it with append().
+        colors is an optional (N, 4) array of per-point RGBA colors, color is used otherwise.
+        """
+        cloud = GLPointCloudItem(color=color, size=size, pxMode=True)
+        if points is not None:
+            self.append(cloud, points, colors)
+        return self._track(cloud, permanent)
+
+    def plot_frames(self, frames, length=10, width=2, names=None, fontsize=10, permanent=False, key=None):
+        """
+        Plot the coordinate systems of a stack of transformation matrices (N, 4, 4) as a single line item.
+        All axis triads are transformed on the CPU in one step and colored per vertex (x red, y green, z blue),
+        so any number of frames costs one upload and one draw call. names optionally labels each frame
+        with one text item at its origin. Returns the list of items (the line item first).
+        """
+        frames = np.asarray(frames, dtype=np.float64)
+        if frames.ndim != 3 or frames.shape[1:] != (4, 4):
+            raise ValueError("frames must have shape (N, 4, 4)")
+        N = frames.shape[0]
+
+        # (N, 3 axes, 2 ends, 3): origin and origin + length * column of the rotation
+        pos = np.empty((N, 3, 2, 3), dtype=np.float32)
+        pos[:, :, 0] = frames[:, None, :3, 3]
+        pos[:, :, 1] = frames[:, None, :3, 3] + length * np.swapaxes(frames[:, :3, :3], 1, 2)
+        colors = np.repeat(AXIS_COLORS, 2, axis=0)
+        colors = np.tile(colors, (N, 1))
 
+        line = self._item(gl.GLLinePlotItem, None if key is None else (key, 'frames'), permanent)
+        self.set_data(line, pos=pos.reshape(-1, 3), color=colors, width=width, antialias=True, mode='lines')
+        items = [line]
+        for i, name in enumerate(names or []):
+            label = self._item(gl.GLTextItem, None if key is None else (key, 'label', i), permanent)
+            self.set_data(label, pos=frames[i, :3, 3], text=str(name), color=(255, 255, 255, 255),
+                          font=QtGui.QFont("Helvetica", fontsize))
+            items.append(label)
+        return items
 
-    def plot_axis(self, P0=np.identity(4), name="", length=10, permanent=True, fontsize=10):
+    def plot_axis(self, P0=np.identity(4), name="", length=10, permanent=True, fontsize=10, key=None):
         """
         Plot a coordinate system at the given transformation matrix P0 using lines.
+        With a key, the six items are retained under (key, 'x'), (key, 'y'), ... (key, 'zlabel').
         """
-        xline = gl.GLLinePlotItem()
-        xline.setData(pos=np.array([[0, 0, 0], [length, 0, 0]]), color=pg.glColor('r'), width=2, antialias=True)
-        yline = gl.GLLinePlotItem()
-        yline.setData(pos=np.array([[0, 0, 0], [0, length, 0]]), color=pg.glColor('g'), width=2, antialias=True)
-        zline = gl.GLLinePlotItem()
-        zline.setData(pos=np.array([[0, 0, 0], [0, 0, length]]), color=pg.glColor('b'), width=2, antialias=True)
+        def item(cls, part):
+            return self._item(cls, None if key is None else (key, part), permanent)
 
-        xlabel = gl.GLTextItem(pos=(length+1, 0, 0), text='X'+name, color=(255, 0, 0, 255), font=QtGui.QFont("Helvetica", fontsize))
-        ylabel = gl.GLTextItem(pos=(0, length+1, 0), text='Y'+name, color=(0, 255, 0, 255), font=QtGui.QFont("Helvetica", fontsize))
-        zlabel = gl.GLTextItem(pos=(0, 0, length+1), text='Z'+name, color=(0, 0, 255, 255), font=QtGui.QFont("Helvetica", fontsize))
+        xline = item(gl.GLLinePlotItem, 'x')
+        self.set_data(xline, pos=np.array([[0, 0, 0], [length, 0, 0]]), color=pg.glColor('r'), width=2, antialias=True)
+        yline = item(gl.GLLinePlotItem, 'y')
+        self.set_data(yline, pos=np.array([[0, 0, 0], [0, length, 0]]), color=pg.glColor('g'), width=2, antialias=True)
+        zline = item(gl.GLLinePlotItem, 'z')
+        self.set_data(zline, pos=np.array([[0, 0, 0], [0, 0, length]]), color=pg.glColor('b'), width=2, antialias=True)
+
+        xlabel = item(gl.GLTextItem, 'xlabel')
+        self.set_data(xlabel, pos=(length+1, 0, 0), text='X'+name, color=(255, 0, 0, 255), font=QtGui.QFont("Helvetica", fontsize))
+        ylabel = item(gl.GLTextItem, 'ylabel')
+        self.set_data(ylabel, pos=(0, length+1, 0), text='Y'+name, color=(0, 255, 0, 255), font=QtGui.QFont("Helvetica", fontsize))
+        zlabel = item(gl.GLTextItem, 'zlabel')
+        self.set_data(zlabel, pos=(0, 0, length+1), text='Z'+name, color=(0, 0, 255, 255), font=QtGui.QFont("Helvetica", fontsize))
 
         if not isinstance(P0, np.ndarray):
             P0 = np.identity(4)
-        m = pg.Transform3D(P0)
-        xline.setTransform(m)
-        yline.setTransform(m)
-        zline.setTransform(m)
-        xlabel.setTransform(m)
-        ylabel.setTransform(m)
-        zlabel.setTransform(m)
-
-        if permanent:
-            self.permanent_items.extend([xline, yline, zline, xlabel, ylabel, zlabel])
-        else:
-            self.items.extend([xline, yline, zline, xlabel, ylabel, zlabel])
-        
\ No newline at end of file
+        items = [xline, yline, zline, xlabel, ylabel, zlabel]
+        self.set_transform(items, P0)
+        return items
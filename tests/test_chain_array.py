@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from backend.math.Functions import batch_forward, batch_T
+from backend.math.MathCore import ChainArray, DHParams
+
+def random_params(rng, n):
+    return np.column_stack((rng.uniform(-180, 180, n), rng.uniform(0, 50, n),
+                            rng.uniform(-180, 180, n), rng.uniform(0, 50, n)))
+
+def expected_frames(params, origin):
+    return batch_forward(params[:, 0], params[:, 1], params[:, 2], params[:, 3], origin=origin)[1]
+
+@pytest.mark.parametrize("capacity", [0, 1, 3, 8])
+def test_append_past_capacity(capacity):
+    params = random_params(np.random.default_rng(10), 13)
+    chain = ChainArray(capacity=capacity)
+    for i, row in enumerate(params):
+        chain.append(DHParams(*row) if i % 2 else row)
+    assert chain.length() == 13
+    assert chain._params.shape[0] >= 13
+    np.testing.assert_array_equal(chain.params, params)
+
+    chain.compute()
+    np.testing.assert_allclose(chain.frames[:, 2], expected_frames(params, None), atol=1e-9)
+    np.testing.assert_allclose(chain.end_effector, chain.frames[-1, 2])
+
+def test_frames_match_batch_forward():
+    rng = np.random.default_rng(11)
+    params = random_params(rng, 6)
+    origin = batch_T(10, 5, 30, 2)
+    chain = ChainArray(params, origin=origin)
+    chain.compute()
+    frames = expected_frames(params, origin)
+    np.testing.assert_allclose(chain.frames[:, 2], frames, atol=1e-9)
+    # P0 of each joint is the previous frame, P1 the frame after RxDx
+    np.testing.assert_allclose(chain.frames[0, 0], origin)
+    np.testing.assert_allclose(chain.frames[1:, 0], frames[:-1], atol=1e-9)
+    np.testing.assert_allclose(chain.frames[:, 1, :3, 2], frames[:, :3, 2], atol=1e-9)
+
+    # edits go through the views into the same buffers
+    params[2] = random_params(rng, 1)[0]
+    chain.set_joint(2, DHParams(*params[2]))
+    chain.joints[4].tita = 45.0
+    params[4, 2] = 45.0
+    chain.compute()
+    np.testing.assert_allclose(chain.frames[:, 2], expected_frames(params, origin), atol=1e-9)
+    np.testing.assert_allclose(np.array([line.P2 for line in chain.lines]), chain.frames[:, 2])
+
+def test_empty_and_cleared_chain():
+    chain = ChainArray(capacity=0)
+    chain.compute()
+    np.testing.assert_array_equal(chain.end_effector, np.identity(4))
+    chain.append((0, 10, 90, 0))
+    chain.clear()
+    assert chain.length() == 0 and chain.params.shape == (0, 4)
@@ -0,0 +1,59 @@
+import os
+
+import pytest
+import sympy as sp
+
+import backend.math.MathCore as MathCore
+from backend.math.MathCore import JointChain, DHParams, chain_key, parse_srepr
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(MathCore, "CACHE_DIR", str(tmp_path))
+    return tmp_path
+
+def symbolic_chain(n):
+    chain = JointChain(mode='symbolic')
+    for i in range(n):
+        chain.append(DHParams.symbolic(i))
+    return chain
+
+def test_srepr_round_trip():
+    a = sp.Symbol('a', real=True)
+    expr = sp.Tuple(sp.Tuple(sp.Symbol('x0'), sp.cos(sp.pi * a / 180)),
+                    sp.ImmutableMatrix([[sp.Float(0.5), -sp.Rational(1, 3)], [sp.sqrt(2) * a - 1, sp.E]]))
+    assert parse_srepr(sp.srepr(expr)) == expr
+
+@pytest.mark.parametrize("text", [
+    """cos("__import__('os').system('echo PWNED')")""",
+    """Symbol('x', real="__import__('os')")""",
+    """Float("__import__('os')")""",
+    """Symbol('x').__class__""",
+    """__import__('os')""",
+    """(lambda: 1)()""",
+])
+def test_srepr_rejects_code(text):
+    with pytest.raises(ValueError):
+        parse_srepr(text)
+
+def test_simplify_reuses_cache(cache_dir):
+    chain = symbolic_chain(2)
+    replacements, reduced = chain.simplify()
+    key = chain_key(chain.origin, chain.joints)
+    assert os.path.isfile(cache_dir / (key + ".txt"))
+
+    cached = symbolic_chain(2)
+    assert cached.simplify() == (replacements, reduced)
+    assert sp.simplify(cached.end_effector - chain.end_effector) == sp.zeros(4, 4)
+
+def test_malicious_cache_file_is_ignored(cache_dir):
+    chain = symbolic_chain(1)
+    key = chain_key(chain.origin, chain.joints)
+    marker = cache_dir / "pwned"
+    payload = f"open({str(marker)!r}, 'w')"
+    (cache_dir / (key + ".txt")).write_text(f"Tuple(Tuple(), cos({payload!r}))")
+
+    assert MathCore._load_cse(key) is None
+    assert not marker.exists()
+    # the chain is simplified from scratch and the cache rewritten
+    replacements, reduced = chain.simplify()
+    assert MathCore._load_cse(key) == (replacements, reduced)
@@ -0,0 +1,34 @@
+import os
+
+import numpy as np
+import pytest
+from PyQt5.QtGui import QImage
+
+from frontend.Export import FrameWriter, setup_headless, gl_available
+
+@pytest.fixture(scope="module")
+def app():
+    return setup_headless()
+
+def test_frame_writer_writes_numbered_frames(tmp_path):
+    frames = [np.full((8, 12, 4), value, dtype=np.uint8) for value in (0, 128, 255)]
+    with FrameWriter(str(tmp_path), workers=2, max_pending=1) as writer:
+        for i, frame in enumerate(frames):
+            writer.submit('scene', i, frame)
+    assert writer.paths == [os.path.join(str(tmp_path), f"scene_{i:05d}.png") for i in range(3)]
+    image = QImage(writer.paths[1])
+    assert (image.width(), image.height()) == (12, 8)
+    assert image.pixelColor(0, 0).red() == 128
+
+def test_render_image_headless(app, tmp_path):
+    if not gl_available():
+        pytest.skip("no OpenGL context on this platform (run under xvfb-run without a display)")
+    from frontend.widgets.PyQt3DPlot import PyQt3DPlot
+    plot = PyQt3DPlot()
+    plot.plot_line_strip(np.random.default_rng(0).uniform(-10, 10, (100, 3)), key='line')
+    plot.show()
+    image = plot.render_image((160, 120))
+    assert (image.width(), image.height()) == (160, 120)
+    with FrameWriter(str(tmp_path)) as writer:
+        writer.submit('scene', 0, image)
+    assert os.path.isfile(writer.paths[0])
@@ -0,0 +1,42 @@
+import numpy as np
+import sympy as sp
+
+from backend.math.Functions import Rz, Ry, Rx, Dz, Dx, RxDx, RzDz, T, batch_Rz, batch_Ry, batch_Rx, batch_T
+
+def test_builders_compose_as_matrix_products():
+    product = Rz(30) * Rx(20)
+    assert isinstance(product, sp.MatrixBase)
+    np.testing.assert_allclose(np.array(product.evalf(), dtype=np.float64), batch_Rz(30) @ batch_Rx(20), atol=1e-12)
+    # an elementwise product would zero the off-diagonal terms of Rz
+    assert product[0, 1] != 0
+
+def test_builders_return_mutable_sympy_matrices():
+    for M in (Rz(30), Ry(15), Rx(20), Dz(5), Dx(5), RxDx(20, 5), RzDz(30, 5), T(20, 5, 30, 5)):
+        assert isinstance(M, sp.MutableDenseMatrix)
+    # the memoized builders must not hand out a shared matrix
+    M = Rz(sp.Integer(30))
+    M[0, 3] = 1
+    assert Rz(sp.Integer(30))[0, 3] == 0
+
+def test_symbolic_and_numeric_builders_agree():
+    alfa, a, tita, d = 20.0, 5.0, 30.0, 7.0
+    np.testing.assert_allclose(np.array(T(alfa, a, tita, d).evalf(), dtype=np.float64),
+                               batch_T(alfa, a, tita, d), atol=1e-12)
+    np.testing.assert_allclose(np.array(Ry(15).evalf(), dtype=np.float64), batch_Ry(15), atol=1e-12)
+    tita_s = sp.Symbol('tita')
+    assert Rz(tita_s).free_symbols == {tita_s}
+
+def test_only_symbolic_arguments_are_memoized():
+    from backend.math import Functions
+    Functions._symbolic_Rz.cache_clear()
+    for value in np.linspace(0, 90, 50):
+        Rz(float(value))
+        T(10, 2.0, float(value), np.float64(3))
+    assert Functions._symbolic_Rz.cache_info().currsize == 0
+    # mixed arguments stay exact but only cache the symbolic factor
+    tita = sp.Symbol('tita')
+    T(10.0, 2.0, tita, 3.0)
+    T(20.0, 2.0, tita, 3.0)
+    assert Functions._symbolic_Rz.cache_info().currsize == 1
+    # sympy numbers are symbolic arguments and give exact matrices
+    assert Rz(sp.Integer(30))[0, 0] == sp.sqrt(3) / 2
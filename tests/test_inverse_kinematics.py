@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from backend.math.Functions import batch_forward, end_positions
+from backend.math.InverseKinematics import solve_ik
+
+# 4-joint revolute arm, targets are drawn from its own configurations so they are reachable
+PARAMS = np.array([[0, 0, 0, 10],
+                   [90, 20, 30, 0],
+                   [0, 20, -40, 0],
+                   [0, 15, 20, 0]], dtype=np.float64)
+
+@pytest.mark.parametrize("seed", range(5))
+def test_position_ik_converges_to_reachable_target(seed):
+    rng = np.random.default_rng(seed)
+    goal = PARAMS.copy()
+    goal[:, 2] = rng.uniform(-150, 150, 4)
+    target = end_positions(goal[None])[0]
+
+    result = solve_ik(PARAMS, target, rng=np.random.default_rng(seed), max_iter=50)
+    assert result.converged
+    np.testing.assert_allclose(end_positions(result.params[None])[0], target, atol=1e-3)
+    # only the joint variables move
+    np.testing.assert_array_equal(np.delete(result.params, 2, axis=1), np.delete(PARAMS, 2, axis=1))
+
+def test_pose_ik_matches_rotation():
+    goal = PARAMS.copy()
+    goal[:, 2] = (20, -60, 45, 10)
+    target = batch_forward(goal[:, 0], goal[:, 1], goal[:, 2], goal[:, 3])[1][-1]
+
+    result = solve_ik(PARAMS, target, orientation=True, seeds=64, max_iter=100,
+                      rng=np.random.default_rng(0))
+    assert result.converged
+    frames = batch_forward(*result.params.T)[1]
+    np.testing.assert_allclose(frames[-1], target, atol=1e-3)
+
+def test_limits_are_respected():
+    limits = np.array([[-30, 30]] * 4, dtype=np.float64)
+    result = solve_ik(PARAMS, (100.0, 100.0, 100.0), limits=limits, rng=np.random.default_rng(1))
+    assert not result.converged
+    assert np.all(result.params[:, 2] >= -30) and np.all(result.params[:, 2] <= 30)
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from backend.math.Functions import batch_forward, end_positions
+from backend.math.MathCore import compile_jacobian, batch_jacobian, geometric_jacobian
+
+def random_params(rng, n):
+    return np.column_stack((rng.uniform(-180, 180, n), rng.uniform(0, 50, n),
+                            rng.uniform(-180, 180, n), rng.uniform(0, 50, n)))
+
+def finite_difference_jacobian(params, joint_types, eps=1e-6):
+    """
+    Linear velocity rows by central differences of end_positions, per radian for revolute joints.
+    """
+    J = np.zeros((3, len(joint_types)))
+    for j, kind in enumerate(joint_types):
+        column, step = (2, np.rad2deg(eps)) if kind == 'R' else (3, eps)
+        plus, minus = params.copy(), params.copy()
+        plus[j, column] += step
+        minus[j, column] -= step
+        J[:, j] = (end_positions(plus[None])[0] - end_positions(minus[None])[0]) / (2 * eps)
+    return J
+
+@pytest.mark.parametrize("joint_types", ["R", "RR", "RPR", "RRPRRR"])
+def test_analytic_jacobian_matches_finite_differences(joint_types):
+    rng = np.random.default_rng(6)
+    params = random_params(rng, len(joint_types))
+    expected = finite_difference_jacobian(params, joint_types)
+
+    analytic = compile_jacobian(joint_types)(*params.ravel())
+    np.testing.assert_allclose(analytic[:3], expected, atol=1e-5)
+
+    numeric = batch_jacobian(params, joint_types)
+    np.testing.assert_allclose(numeric, analytic, atol=1e-5)
+
+def test_geometric_jacobian_matches_analytic():
+    rng = np.random.default_rng(7)
+    joint_types = "RRPR"
+    # one chain in five configurations
+    params = np.repeat(random_params(rng, len(joint_types))[None], 5, axis=0)
+    params[..., 2] = rng.uniform(-180, 180, (5, len(joint_types)))
+    frames = batch_forward(params[..., 0], params[..., 1], params[..., 2], params[..., 3])[1]
+    revolute = np.array([kind == 'R' for kind in joint_types])
+
+    J = geometric_jacobian(frames, revolute)
+    analytic = compile_jacobian(joint_types)
+    for s in range(params.shape[0]):
+        np.testing.assert_allclose(J[s], analytic(*params[s].ravel()), atol=1e-9)
+    np.testing.assert_allclose(geometric_jacobian(frames, revolute, orientation=False), J[:, :3])
@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+import sympy as sp
+
+from backend.math.Functions import batch_forward, batch_T
+from backend.math.MathCore import JointChain, DHParams
+
+def random_params(rng, n):
+    return np.column_stack((rng.uniform(-180, 180, n), rng.uniform(0, 50, n),
+                            rng.uniform(-180, 180, n), rng.uniform(0, 50, n)))
+
+def numeric_chain(params, origin=None):
+    chain = JointChain(mode='numeric')
+    if origin is not None:
+        chain.origin = origin
+    for row in params:
+        chain.append(DHParams(*row))
+    return chain
+
+def assert_matches_forward(chain, params, origin=None):
+    frames = batch_forward(params[:, 0], params[:, 1], params[:, 2], params[:, 3], origin=origin)[1]
+    assert len(chain.lines) == len(params)
+    P2 = np.array([np.array(line.P2, dtype=np.float64) for line in chain.lines])
+    np.testing.assert_allclose(P2, frames, atol=1e-9)
+    np.testing.assert_allclose(np.array(chain.end_effector, dtype=np.float64), frames[-1], atol=1e-9)
+
+@pytest.mark.parametrize("k", [1, 3, 5])
+def test_editing_joint_k_recomputes_only_frames_k_onward(k):
+    rng = np.random.default_rng(4)
+    params = random_params(rng, 6)
+    chain = numeric_chain(params)
+    chain.compute()
+    before = list(chain._frames)
+
+    params[k] = random_params(rng, 1)[0]
+    chain.set_joint(k, DHParams(*params[k]))
+    # setting an unchanged joint to equal values does not invalidate it
+    chain.set_joint(0, DHParams(*params[0]))
+    assert chain._first_changed() == k
+    chain.compute()
+
+    assert all(chain._frames[i] is before[i] for i in range(k))
+    assert not any(chain._frames[i][1] is before[i][1] for i in range(k, 6))
+    assert_matches_forward(chain, params)
+
+def test_unchanged_chain_is_not_recomputed():
+    chain = numeric_chain(random_params(np.random.default_rng(5), 4))
+    chain.compute()
+    before = list(chain._frames)
+    chain.compute()
+    assert all(a is b for a, b in zip(chain._frames, before))
+
+def test_append_and_shrink_match_batch_forward():
+    rng = np.random.default_rng(6)
+    origin = batch_T(15, 3, -20, 4)
+    params = random_params(rng, 4)
+    chain = numeric_chain(params, origin)
+    chain.compute()
+    assert_matches_forward(chain, params, origin)
+
+    # appending keeps the prefix and computes only the new joints
+    extra = random_params(rng, 2)
+    before = list(chain._frames)
+    for i, row in enumerate(extra):
+        chain.set_joint(4 + i, DHParams(*row))
+    params = np.concatenate([params, extra])
+    assert chain._first_changed() == 4
+    chain.compute()
+    assert all(chain._frames[i] is before[i] for i in range(4))
+    assert_matches_forward(chain, params, origin)
+
+    # dropping joints keeps the remaining frames
+    before = list(chain._frames)
+    del chain.joints[3:]
+    chain.compute()
+    assert all(chain._frames[i] is before[i] for i in range(3))
+    assert_matches_forward(chain, params[:3], origin)
+
+    # a new origin invalidates everything
+    chain.origin = np.identity(4)
+    assert chain._first_changed() == 0
+    chain.compute()
+    assert_matches_forward(chain, params[:3])
+
+def test_symbolic_chain_matches_numeric():
+    rng = np.random.default_rng(7)
+    params = np.round(random_params(rng, 3))
+    chain = JointChain(mode='symbolic')
+    for row in params:
+        chain.append(DHParams(*[sp.Integer(int(v)) for v in row]))
+    chain.compute()
+    chain.set_joint(1, DHParams(*[sp.Integer(int(v)) for v in params[1] + 1]))
+    params[1] += 1
+    chain.compute()
+    assert_matches_forward(chain, params)
+    assert isinstance(chain.end_effector, sp.MatrixBase)
@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+
+from frontend.widgets.PyQt3DPlot import lod_levels
+
+def helix(n):
+    t = np.linspace(0, 20 * np.pi, n)
+    return np.column_stack((np.cos(t), np.sin(t), 0.1 * t))
+
+@pytest.mark.parametrize("n, min_points", [(100000, 1024), (5000, 256), (2049, 1024), (500, 1024)])
+def test_level_vertex_counts(n, min_points):
+    levels = lod_levels(helix(n), min_points=min_points)
+    np.testing.assert_array_equal(levels[0], np.arange(n))
+    for previous, level in zip(levels, levels[1:]):
+        # each level halves the previous one
+        assert level.shape[0] == previous.shape[0] // 2
+        assert np.isin(level, previous).all()
+        assert np.all(np.diff(level) > 0)
+        assert level[0] == 0 and level[-1] == n - 1
+    # decimation stops once a level is at most 2 * min_points long
+    assert levels[-1].shape[0] <= 2 * min_points
+    assert all(level.shape[0] > 2 * min_points for level in levels[:-1])
+
+def test_stride_bounds_the_gaps():
+    stride = 8
+    levels = lod_levels(helix(20000), min_points=256, stride=stride)
+    for previous, level in zip(levels, levels[1:]):
+        positions = np.searchsorted(previous, level)
+        assert np.diff(positions).max() <= stride
+
+def test_curved_regions_keep_more_points():
+    # a straight run followed by a tight spiral of the same length
+    straight = np.column_stack((np.linspace(-100, 0, 10000), np.zeros(10000), np.zeros(10000)))
+    t = np.linspace(0, 40 * np.pi, 10000)
+    spiral = np.column_stack((np.sin(t), 1 - np.cos(t), np.zeros_like(t)))
+    coarse = lod_levels(np.concatenate((straight, spiral)), min_points=512)[-1]
+    assert np.sum(coarse >= 10000) > 2 * np.sum(coarse < 10000)
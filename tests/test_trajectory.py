@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from backend.math.Functions import batch_forward
+from backend.math.Trajectory import interpolate, trajectory_frames
+
+WAYPOINTS = np.array([[[0, 10, 0, 5], [90, 20, 30, 0]],
+                      [[0, 10, 60, 5], [90, 20, -30, 0]],
+                      [[0, 10, 20, 5], [90, 20, 45, 0]],
+                      [[0, 10, -90, 5], [90, 20, 0, 0]]], dtype=np.float64)
+
+@pytest.mark.parametrize("method", ["linear", "cubic"])
+def test_interpolation_passes_through_waypoints(method):
+    per_segment = 25
+    frames = interpolate(WAYPOINTS, (len(WAYPOINTS) - 1) * per_segment + 1, method)
+    assert frames.shape[1:] == WAYPOINTS.shape[1:]
+    np.testing.assert_allclose(frames[::per_segment], WAYPOINTS, atol=1e-12)
+
+def test_cubic_is_natural_and_smooth():
+    per_segment = 400
+    frames = interpolate(WAYPOINTS, (len(WAYPOINTS) - 1) * per_segment + 1, 'cubic').reshape(-1, 8)
+    dt = 1.0 / per_segment
+    acceleration = np.diff(frames, 2, axis=0) / dt ** 2
+    scale = np.abs(acceleration).max()
+    # natural spline: no acceleration at the ends
+    np.testing.assert_allclose(acceleration[[0, -1]], 0, atol=1e-2 * scale)
+    # continuous velocity and acceleration across the inner waypoints
+    velocity = np.diff(frames, axis=0) / dt
+    for knot in range(per_segment, len(frames) - 1, per_segment):
+        np.testing.assert_allclose(velocity[knot], velocity[knot - 1], atol=1e-2 * np.abs(velocity).max())
+        np.testing.assert_allclose(acceleration[knot - 1], acceleration[knot - 2], atol=1e-2 * scale)
+
+def test_two_waypoints_cubic_is_linear():
+    frames = interpolate(WAYPOINTS[:2], 11, 'cubic')
+    np.testing.assert_allclose(frames, interpolate(WAYPOINTS[:2], 11, 'linear'), atol=1e-12)
+
+def test_interpolate_needs_two_waypoints():
+    with pytest.raises(ValueError):
+        interpolate(WAYPOINTS[:1], 10)
+
+def test_trajectory_frames_match_forward_kinematics():
+    params = interpolate(WAYPOINTS, 16, 'cubic')
+    P1, P2 = trajectory_frames(params)
+    expected = batch_forward(params[..., 0], params[..., 1], params[..., 2], params[..., 3])[1]
+    np.testing.assert_allclose(P2, expected, atol=1e-9)
+    # the frame after RxDx keeps the joint axis of the full frame
+    np.testing.assert_allclose(P1[..., :3, 2], P2[..., :3, 2], atol=1e-12)
@@ -0,0 +1,90 @@
+from multiprocessing import shared_memory
+
+import numpy as np
+import pytest
+
+from backend.math.Functions import batch_T, end_positions
+from backend.math.MathCore import batch_jacobian
+from backend.math.Workspace import sample_workspace, joint_grid, GridJob, DH_INTERVALS, RESULT_COLUMNS
+
+def fixed_intervals(params, spread=None):
+    """
+    (N, 4, 2) intervals pinned to params, with the tita columns opened to spread.
+    """
+    intervals = np.repeat(np.asarray(params, dtype=np.float64)[..., None], 2, axis=-1)
+    if spread is not None:
+        intervals[:, 2] = spread
+    return intervals
+
+def test_chunks_cover_all_samples():
+    intervals = np.tile(np.array(DH_INTERVALS, dtype=np.float64), (3, 1, 1))
+    chunks = list(sample_workspace(intervals, 10000, chunk_size=3000, seed=0))
+    assert [chunk.shape for chunk in chunks] == [(3000, 3)] * 3 + [(1000, 3)]
+    # the same seed gives the same samples whatever the chunking
+    again = np.concatenate(list(sample_workspace(intervals, 10000, chunk_size=3000, seed=0)))
+    np.testing.assert_array_equal(np.concatenate(chunks), again)
+
+def test_samples_stay_inside_the_reachable_shell():
+    params = np.array([[0, 0, 0, 10], [90, 20, 0, 0], [0, 30, 0, 5]], dtype=np.float64)
+    intervals = fixed_intervals(params, spread=(-180, 180))
+    points = np.concatenate(list(sample_workspace(intervals, 20000, chunk_size=4096, seed=1)))
+    reach = np.abs(params[:, 1]).sum() + np.abs(params[:, 3]).sum()
+    assert np.linalg.norm(points, axis=1).max() <= reach + 1e-9
+    # the samples fill the workspace instead of piling up at one pose
+    assert np.ptp(points, axis=0).min() > 0.5 * reach
+
+def test_pinned_intervals_give_the_forward_kinematics():
+    params = np.array([[10, 5, 30, 2], [-45, 15, 60, 0]], dtype=np.float64)
+    origin = batch_T(0, 0, 90, 10)
+    points = next(sample_workspace(fixed_intervals(params), 5, origin=origin))
+    np.testing.assert_allclose(points, np.repeat(end_positions(params[None], origin), 5, axis=0), atol=1e-9)
+
+def test_invalid_intervals():
+    with pytest.raises(ValueError):
+        list(sample_workspace(np.zeros((2, 4)), 10))
+    assert list(sample_workspace(np.zeros((0, 4, 2)), 10)) == []
+
+def serial_grid(params, variables, axes, joint_types):
+    """
+    The GridJob results computed in one process: end positions and finite difference Jacobians.
+    """
+    grid = np.stack(np.meshgrid(*axes, indexing='ij'), axis=-1).reshape(-1, len(axes))
+    batch = np.repeat(params[None], grid.shape[0], axis=0)
+    for k, (joint, column) in enumerate(variables):
+        batch[:, joint, column] = grid[:, k]
+    s = np.linalg.svd(batch_jacobian(batch, joint_types)[:, :3], compute_uv=False)
+    with np.errstate(divide='ignore'):
+        return np.column_stack((end_positions(batch), np.prod(s, axis=-1), s[:, 0] / s[:, -1]))
+
+def test_grid_job_matches_serial_computation():
+    params = np.array([[0, 0, 0, 10], [90, 20, 0, 0], [0, 30, 0, 5]], dtype=np.float64)
+    intervals = np.tile(np.array(DH_INTERVALS, dtype=np.float64), (3, 1, 1))
+    joint_types = 'RPR'
+    variables, axes = joint_grid(intervals, 7, joint_types)
+    job = GridJob(params, variables, axes, joint_types=joint_types, workers=2, task_size=100, chunk_size=32)
+    try:
+        results = job.wait()
+        assert job.done() and job.progress() == 1.0
+    finally:
+        job.close()
+
+    expected = serial_grid(params, variables, axes, joint_types)
+    assert results.shape == (7 ** 3, len(RESULT_COLUMNS))
+    np.testing.assert_allclose(results[:, :3], expected[:, :3], atol=1e-3)
+    np.testing.assert_allclose(results[:, 3], expected[:, 3], rtol=1e-3, atol=1e-2)
+    finite = np.isfinite(expected[:, 4]) & (expected[:, 4] < 1e3)
+    np.testing.assert_allclose(results[finite, 4], expected[finite, 4], rtol=1e-3)
+
+def test_grid_job_close_unlinks_shared_memory():
+    variables, axes = joint_grid(np.tile(np.array(DH_INTERVALS, dtype=np.float64), (2, 1, 1)), 5)
+    job = GridJob(np.array([[0, 10, 0, 0], [0, 10, 0, 0]], dtype=np.float64), variables, axes, workers=1)
+    results = job.wait()
+    name = job.shm.name
+    job.close()
+    job.close()
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=name)
+    # the copy from wait() outlives the shared block, a later wait() does not
+    assert np.isfinite(results[:, :3]).all()
+    with pytest.raises(RuntimeError):
+        job.wait()